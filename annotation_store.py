@@ -0,0 +1,188 @@
+import argparse
+import os
+import sqlite3
+from typing import Optional, Set
+
+import pandas as pd
+
+# Annotations live in SQLite while annotating: every save is one small
+# transaction instead of rewriting annotation.csv. annotation.csv stays the
+# exchange format that evaluate.py and git see; it is imported when it changed
+# outside the store and exported again when the store has new annotations.
+# A CSV edited outside the store replaces the store's contents, so rows
+# deleted from it stay deleted. If the store also has saves the CSV lacks,
+# neither side is overwritten; resolve by merging the CSV into the store or
+# overwriting the CSV with the store:
+#   python annotation_store.py import annotation.csv
+#   python annotation_store.py export annotation.csv
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS annotations (
+    file_name TEXT PRIMARY KEY,
+    transcript TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class AnnotationConflict(RuntimeError):
+    """annotation.csv and the store were both changed since the last sync."""
+
+
+def _file_signature(path: str) -> str:
+    """Modification time and size, enough to notice a CSV edited behind the store's back."""
+    stat = os.stat(path)
+    return f'{stat.st_mtime_ns}:{stat.st_size}'
+
+
+class AnnotationStore:
+    """Transcripts keyed by file name in an SQLite database with atomic, indexed updates."""
+
+    def __init__(self, path: str = 'annotation.db'):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        # The write-ahead log keeps every committed save intact if the program dies mid-write
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def _get_meta(self, key: str, default: str = None) -> Optional[str]:
+        row = self.connection.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key: str, value: str):
+        self.connection.execute('INSERT INTO meta (key, value) VALUES (?, ?) '
+                                'ON CONFLICT(key) DO UPDATE SET value = excluded.value', (key, value))
+
+    def _bump_revision(self):
+        self._set_meta('revision', str(int(self._get_meta('revision', '0')) + 1))
+
+    def __len__(self) -> int:
+        return self.connection.execute('SELECT COUNT(*) FROM annotations').fetchone()[0]
+
+    def __contains__(self, file_name: str) -> bool:
+        return self.get(file_name) is not None
+
+    def get(self, file_name: str) -> Optional[str]:
+        row = self.connection.execute('SELECT transcript FROM annotations WHERE file_name = ?',
+                                      (file_name,)).fetchone()
+        return row[0] if row else None
+
+    def annotated_files(self) -> Set[str]:
+        return {row[0] for row in self.connection.execute('SELECT file_name FROM annotations')}
+
+    def save(self, file_name: str, transcript: str):
+        """Add or replace one annotation in a single transaction."""
+        with self.connection:
+            self.connection.execute('INSERT INTO annotations (file_name, transcript) VALUES (?, ?) '
+                                    'ON CONFLICT(file_name) DO UPDATE SET transcript = excluded.transcript',
+                                    (file_name, transcript))
+            self._bump_revision()
+
+    def delete(self, file_name: str):
+        with self.connection:
+            self.connection.execute('DELETE FROM annotations WHERE file_name = ?', (file_name,))
+            self._bump_revision()
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """All annotations in the order they were first saved, with the annotation.csv columns."""
+        return pd.read_sql_query('SELECT file_name, transcript FROM annotations ORDER BY rowid', self.connection)
+
+    def has_unexported(self) -> bool:
+        """Whether annotations were saved or deleted since the CSV was last written or read."""
+        return self._get_meta('exported_revision', '0') != self._get_meta('revision', '0')
+
+    def csv_changed(self, csv_path: str) -> bool:
+        """Whether the CSV exists and was changed since the store last wrote or read it."""
+        return os.path.exists(csv_path) and self._get_meta('csv_signature') != _file_signature(csv_path)
+
+    def import_csv(self, csv_path: str, replace: bool = False) -> int:
+        """
+        Upsert every row of an annotation CSV in one transaction; later rows of
+        a file name win, as they did when the CSV was appended to. With
+        replace, annotations missing from the CSV are deleted first.
+        Returns the number of rows read.
+        """
+        df = pd.read_csv(csv_path, dtype={'file_name': str, 'transcript': str}, keep_default_na=False)
+        in_sync = self._get_meta('exported_revision') == self._get_meta('revision', '0')
+        with self.connection:
+            if replace:
+                self.connection.execute('DELETE FROM annotations')
+            self.connection.executemany(
+                'INSERT INTO annotations (file_name, transcript) VALUES (?, ?) '
+                'ON CONFLICT(file_name) DO UPDATE SET transcript = excluded.transcript',
+                df[['file_name', 'transcript']].itertuples(index=False, name=None))
+            self._bump_revision()
+            self._set_meta('csv_signature', _file_signature(csv_path))
+            # Saves that never reached the CSV still need exporting after the merge
+            if in_sync or not self._get_meta('exported_revision'):
+                self._set_meta('exported_revision', self._get_meta('revision'))
+        return len(df)
+
+    def export_csv(self, csv_path: str):
+        """Write all annotations in the annotation.csv format, replacing the file atomically."""
+        tmp_path = csv_path + '.tmp'
+        self.to_dataframe().to_csv(tmp_path, index=False)
+        os.replace(tmp_path, csv_path)
+        with self.connection:
+            self._set_meta('csv_signature', _file_signature(csv_path))
+            self._set_meta('exported_revision', self._get_meta('revision', '0'))
+
+    def sync_from_csv(self, csv_path: str) -> bool:
+        """
+        Make the store match the CSV if it is new to the store or changed since
+        the last import or export. Raises AnnotationConflict instead when the
+        store has saves that never reached the CSV.
+        """
+        if not self.csv_changed(csv_path):
+            return False
+        if self.has_unexported():
+            raise AnnotationConflict(
+                f"{csv_path} was changed outside the annotation store, which has unexported annotations; "
+                f"run 'python annotation_store.py import' to merge them or 'export' to overwrite the CSV")
+        self.import_csv(csv_path, replace=True)
+        return True
+
+    def export_if_changed(self, csv_path: str) -> bool:
+        """
+        Export only when annotations were saved or deleted since the CSV was
+        last written. Raises AnnotationConflict rather than overwrite a CSV
+        that was changed outside the store in the meantime.
+        """
+        if not self.has_unexported() and os.path.exists(csv_path):
+            return False
+        if self.csv_changed(csv_path):
+            raise AnnotationConflict(
+                f"{csv_path} was changed outside the annotation store since it was last synced; "
+                f"run 'python annotation_store.py import' to merge it into the store, then export")
+        self.export_csv(csv_path)
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Move annotations between annotation.csv and the SQLite store')
+    parser.add_argument('command', choices=['import', 'export'],
+                        help='import: merge the CSV into the store; export: write the store to the CSV')
+    parser.add_argument('csv', nargs='?', default='annotation.csv', help='annotation CSV')
+    parser.add_argument('--db', default='annotation.db', help='SQLite annotation store')
+    args = parser.parse_args()
+
+    store = AnnotationStore(args.db)
+    try:
+        if args.command == 'import':
+            rows = store.import_csv(args.csv)
+            print(f"Imported {rows} rows from {args.csv}, {len(store)} annotations in {args.db}")
+        else:
+            store.export_csv(args.csv)
+            print(f"Exported {len(store)} annotations to {args.csv}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,105 @@
+import argparse
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import pygame
-import pandas as pd
+import io
+import numpy as np
 import os
 import threading
-import time
+from collections import OrderedDict
 from pathlib import Path
 
+from annotation_store import AnnotationConflict, AnnotationStore
+from benchmarks.audio import read_wav
+from pre_annotation import BackgroundRecognizer, HypothesisIndex
+
+class AudioPrefetcher:
+    """Decodes clips in a background thread into a bounded LRU cache so playback never waits on the disk"""
+    
+    def __init__(self, wav_dir, capacity=16, on_loaded=None):
+        self.wav_dir = Path(wav_dir)
+        self.capacity = capacity
+        self.on_loaded = on_loaded  # called from the prefetch thread with the file name
+        self._cache = OrderedDict()
+        self._wanted = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+    
+    def load(self, file_name):
+        """Read a clip once and decode it into a pygame Sound for playback and int16 samples for the waveform"""
+        data = (self.wav_dir / file_name).read_bytes()
+        sound = pygame.mixer.Sound(file=io.BytesIO(data))
+        try:
+            samples = read_wav(io.BytesIO(data))
+        except Exception:
+            samples = np.zeros(0, dtype=np.int16)  # plays fine, only the waveform stays empty
+        return {'sound': sound, 'samples': samples}
+    
+    def peek(self, file_name):
+        """The cached clip, or None if it has not been decoded yet"""
+        with self._lock:
+            clip = self._cache.get(file_name)
+            if clip is not None:
+                self._cache.move_to_end(file_name)
+            return clip
+    
+    def get(self, file_name):
+        """The cached clip, decoding it right away if the prefetcher has not got to it yet"""
+        clip = self.peek(file_name)
+        if clip is None:
+            clip = self.load(file_name)
+            self._store(file_name, clip)
+        return clip
+    
+    def prefetch(self, file_names):
+        """Replace the queue of clips to decode, most urgent first"""
+        with self._lock:
+            self._wanted = [f for f in file_names if f not in self._cache]
+        self._wakeup.set()
+    
+    def discard(self, file_name):
+        with self._lock:
+            self._cache.pop(file_name, None)
+            if file_name in self._wanted:
+                self._wanted.remove(file_name)
+    
+    def _store(self, file_name, clip):
+        with self._lock:
+            self._cache[file_name] = clip
+            self._cache.move_to_end(file_name)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+    
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                if not self._wanted:
+                    self._wakeup.clear()
+                    continue
+                file_name = self._wanted.pop(0)
+                if file_name in self._cache:
+                    continue
+            try:
+                clip = self.load(file_name)
+            except Exception as e:
+                print(f"Error prefetching {file_name}: {e}")
+                continue
+            self._store(file_name, clip)
+            if self.on_loaded:
+                self.on_loaded(file_name)
+
+def waveform_envelope(samples, width):
+    """Lowest and highest sample under each of width pixel columns, scaled to [-1, 1]"""
+    if len(samples) == 0 or width <= 0:
+        return np.zeros(0), np.zeros(0)
+    starts = np.minimum(np.linspace(0, len(samples), width + 1)[:-1].astype(int), len(samples) - 1)
+    return (np.minimum.reduceat(samples, starts) / 32768.0,
+            np.maximum.reduceat(samples, starts) / 32768.0)
+
 class AudioAnnotationGUI:
-    def __init__(self, root):
+    def __init__(self, root, prefill=True, order="name", recognizer=None):
         self.root = root
         self.root.title("Audio Annotation Tool")
         self.root.geometry("800x600")
@@ -19,12 +110,33 @@ class AudioAnnotationGUI:
         # Paths
         self.wav_store_path = Path("wavStore")
         self.annotation_file = Path("annotation.csv")
+        self.annotation_store = AnnotationStore("annotation.db")
         
         # Variables
         self.current_file_index = 0
         self.files_to_annotate = []
         self.is_playing = False
         self.current_sound = None
+        self.playback_timer = None
+        
+        # Clips before and after the current one are decoded while the annotator types
+        self.prefetch_count = 3
+        self.prefetcher = AudioPrefetcher(self.wav_store_path, capacity=2 * self.prefetch_count + 4,
+                                          on_loaded=lambda f: self.root.after(0, self.on_clip_loaded, f))
+        
+        # Model hypotheses from the benchmark transcripts, used to prefill the text box
+        self.prefill = prefill
+        self.order = order
+        self.sync_annotations()
+        self.hypotheses = HypothesisIndex(annotations_df=self.annotation_store.to_dataframe())
+        
+        # Optional recognizer for files no benchmark has transcribed, e.g. ("vosk", "vosk-model-small-de-0.15")
+        self.background_recognizer = None
+        if recognizer is not None:
+            backend, model = recognizer
+            self.background_recognizer = BackgroundRecognizer(
+                backend, model, self.wav_store_path,
+                on_result=lambda f, m, t: self.root.after(0, self.on_hypothesis, f, m, t))
         
         # Load data
         self.load_files_to_annotate()
@@ -36,6 +148,15 @@ class AudioAnnotationGUI:
         if self.files_to_annotate:
             self.load_current_file()
     
+    def sync_annotations(self):
+        """Pick up annotation.csv if it was edited outside the tool, keeping the store on a conflict"""
+        try:
+            self.annotation_store.sync_from_csv(str(self.annotation_file))
+        except AnnotationConflict as e:
+            messagebox.showwarning("Annotation conflict", str(e))
+        except Exception as e:
+            print(f"Error reading annotation file: {e}")
+    
     def load_files_to_annotate(self):
         """Load WAV files that don't have annotations yet"""
         # Get all WAV files
@@ -43,18 +164,14 @@ class AudioAnnotationGUI:
         if self.wav_store_path.exists():
             all_wav_files = {f.name for f in self.wav_store_path.glob("*.wav")}
         
-        # Get annotated files
-        annotated_files = set()
-        if self.annotation_file.exists():
-            try:
-                df = pd.read_csv(self.annotation_file)
-                if 'file_name' in df.columns:
-                    annotated_files = set(df['file_name'].tolist())
-            except Exception as e:
-                print(f"Error reading annotation file: {e}")
+        # Get annotated files; annotation.csv was synced into the store at startup
+        annotated_files = self.annotation_store.annotated_files()
         
         # Files that need annotation
         self.files_to_annotate = sorted(list(all_wav_files - annotated_files))
+        if self.order == "disagreement":
+            # Files the models transcribe most differently are the most informative to annotate
+            self.files_to_annotate = self.hypotheses.order_by_disagreement(self.files_to_annotate)
         
     def create_widgets(self):
         """Create the GUI widgets"""
@@ -82,6 +199,11 @@ class AudioAnnotationGUI:
         self.progress_label = ttk.Label(info_frame, text="0 / 0")
         self.progress_label.grid(row=1, column=1, sticky=(tk.W, tk.E))
         
+        # Which model the prefilled transcript came from
+        ttk.Label(info_frame, text="Suggestion:").grid(row=2, column=0, sticky=tk.W, padx=(0, 5))
+        self.suggestion_label = ttk.Label(info_frame, text="-")
+        self.suggestion_label.grid(row=2, column=1, sticky=(tk.W, tk.E))
+        
         # Audio controls frame
         audio_frame = ttk.LabelFrame(main_frame, text="Audio Controls", padding="5")
         audio_frame.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 10))
@@ -106,6 +228,12 @@ class AudioAnnotationGUI:
                                 command=self.update_volume, orient=tk.HORIZONTAL, length=200)
         volume_scale.grid(row=0, column=1)
         
+        # Waveform of the current clip
+        audio_frame.columnconfigure(0, weight=1)
+        self.waveform = tk.Canvas(audio_frame, height=80, background="white", highlightthickness=0)
+        self.waveform.grid(row=2, column=0, pady=5, sticky=(tk.W, tk.E))
+        self.waveform.bind('<Configure>', lambda e: self.draw_waveform())
+        
         # Transcript frame
         transcript_frame = ttk.LabelFrame(main_frame, text="Transcript", padding="5")
         transcript_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
@@ -169,12 +297,83 @@ class AudioAnnotationGUI:
             self.current_file_label.config(text=current_file)
             self.progress_label.config(text=f"{self.current_file_index + 1} / {len(self.files_to_annotate)}")
             self.transcript_text.delete(1.0, tk.END)
+            self.suggestion_label.config(text="-")
+            self.prefill_transcript()
             self.enable_controls()
+            self.prefetch_around()
+            self.queue_recognition()
+            self.draw_waveform()
         else:
             self.current_file_label.config(text="All files completed!")
             self.progress_label.config(text=f"{len(self.files_to_annotate)} / {len(self.files_to_annotate)}")
             self.disable_controls()
     
+    def current_file_name(self):
+        """The file being annotated, or None when there is none"""
+        if 0 <= self.current_file_index < len(self.files_to_annotate):
+            return self.files_to_annotate[self.current_file_index]
+        return None
+    
+    def prefetch_around(self):
+        """Queue the current clip, then its neighbours alternating forwards and backwards"""
+        index = self.current_file_index
+        order = [index]
+        for offset in range(1, self.prefetch_count + 1):
+            order += [index + offset, index - offset]
+        self.prefetcher.prefetch([self.files_to_annotate[i] for i in order
+                                  if 0 <= i < len(self.files_to_annotate)])
+    
+    def prefill_transcript(self):
+        """Put the best available model hypothesis into the empty text box"""
+        best = self.hypotheses.best(self.current_file_name()) if self.prefill else None
+        if best is not None:
+            model, transcript = best
+            self.transcript_text.insert(1.0, transcript)
+            self.transcript_text.tag_add(tk.SEL, 1.0, tk.END)  # typing replaces the suggestion
+            self.suggestion_label.config(text=model)
+        # Anything modified from here on was typed by the annotator
+        self.transcript_text.edit_modified(False)
+    
+    def queue_recognition(self):
+        """Let the background recognizer work through files without hypotheses, starting at the current one"""
+        if self.background_recognizer is None:
+            return
+        upcoming = self.files_to_annotate[self.current_file_index:] + self.files_to_annotate[:self.current_file_index]
+        self.background_recognizer.prioritize([f for f in upcoming if f not in self.hypotheses])
+    
+    def on_hypothesis(self, file_name, model, transcript):
+        """Store a background transcript and show it if its file is open and still untouched"""
+        self.hypotheses.add(file_name, model, transcript)
+        if (self.prefill and file_name == self.current_file_name() and not self.transcript_text.edit_modified()
+                and not self.transcript_text.get(1.0, tk.END).strip()):
+            self.prefill_transcript()
+    
+    def on_clip_loaded(self, file_name):
+        """Draw the waveform as soon as the clip being shown has been decoded"""
+        if file_name == self.current_file_name():
+            self.draw_waveform()
+    
+    def draw_waveform(self):
+        """Render the min/max envelope of the cached samples of the current clip"""
+        self.waveform.delete("all")
+        current_file = self.current_file_name()
+        if current_file is None:
+            return
+        width, height = self.waveform.winfo_width(), self.waveform.winfo_height()
+        clip = self.prefetcher.peek(current_file)
+        if clip is None:
+            self.waveform.create_text(width // 2, height // 2, text="Loading...", fill="gray")
+            return
+        lows, highs = waveform_envelope(clip['samples'], width)
+        if len(lows) == 0:
+            return
+        middle = height / 2
+        x = np.arange(len(lows))
+        # One polygon along the upper envelope and back along the lower one
+        upper = np.column_stack([x, middle - highs * middle])
+        lower = np.column_stack([x[::-1], middle - lows[::-1] * middle + 1])
+        self.waveform.create_polygon(*np.concatenate([upper, lower]).ravel().tolist(), fill="steelblue")
+    
     def enable_controls(self):
         """Enable all controls"""
         self.play_button.config(state="normal")
@@ -213,20 +412,24 @@ class AudioAnnotationGUI:
         
         try:
             self.stop_audio()  # Stop any currently playing audio
-            self.current_sound = pygame.mixer.Sound(str(file_path))
+            self.current_sound = self.prefetcher.get(current_file)['sound']
             self.current_sound.set_volume(self.volume_var.get())
             self.current_sound.play()
             self.is_playing = True
             self.play_button.config(text="Playing...")
             
-            # Start a thread to check when playback finishes
-            threading.Thread(target=self.check_playback_status, daemon=True).start()
+            # Reset the button when the clip has played to the end
+            self.playback_timer = self.root.after(int(self.current_sound.get_length() * 1000),
+                                                  self.on_playback_finished)
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to play audio: {str(e)}")
     
     def stop_audio(self):
         """Stop audio playback"""
+        if self.playback_timer is not None:
+            self.root.after_cancel(self.playback_timer)
+            self.playback_timer = None
         if self.current_sound:
             self.current_sound.stop()
         pygame.mixer.stop()
@@ -240,14 +443,12 @@ class AudioAnnotationGUI:
         else:
             self.play_audio()
     
-    def check_playback_status(self):
-        """Check if audio is still playing (runs in separate thread)"""
-        while self.is_playing and pygame.mixer.get_busy():
-            time.sleep(0.1)
-        
-        if self.is_playing:  # If we exit the loop and is_playing is still True, playback finished naturally
+    def on_playback_finished(self):
+        """Runs on the Tk main loop once the clip's duration has elapsed"""
+        self.playback_timer = None
+        if self.is_playing:
             self.is_playing = False
-            self.root.after(0, lambda: self.play_button.config(text="Play"))
+            self.play_button.config(text="Play")
     
     def update_volume(self, value):
         """Update volume"""
@@ -255,7 +456,7 @@ class AudioAnnotationGUI:
             self.current_sound.set_volume(float(value))
     
     def save_transcript(self):
-        """Save the transcript to annotation.csv"""
+        """Save the transcript to the annotation store"""
         if not self.files_to_annotate or self.current_file_index >= len(self.files_to_annotate):
             return
         
@@ -267,18 +468,8 @@ class AudioAnnotationGUI:
         current_file = self.files_to_annotate[self.current_file_index]
         
         try:
-            # Load existing annotations or create new DataFrame
-            if self.annotation_file.exists():
-                df = pd.read_csv(self.annotation_file)
-            else:
-                df = pd.DataFrame(columns=['file_name', 'transcript'])
-            
-            # Add new annotation
-            new_row = pd.DataFrame({'file_name': [current_file], 'transcript': [transcript]})
-            df = pd.concat([df, new_row], ignore_index=True)
-            
-            # Save to CSV
-            df.to_csv(self.annotation_file, index=False)
+            # One committed row per save; annotation.csv is written when the tool closes
+            self.annotation_store.save(current_file, transcript)
             
             #messagebox.showinfo("Success", f"Transcript saved for {current_file}")
             
@@ -311,6 +502,7 @@ class AudioAnnotationGUI:
         
         try:
             self.stop_audio()  # Stop playback before deleting
+            self.prefetcher.discard(current_file)
             
             if file_path.exists():
                 file_path.unlink()  # Delete the file
@@ -347,11 +539,34 @@ class AudioAnnotationGUI:
     def skip_file(self):
         """Skip current file without saving"""
         self.next_file()
+    
+    def close(self):
+        """Export new annotations to annotation.csv for evaluate.py and quit"""
+        try:
+            self.annotation_store.export_if_changed(str(self.annotation_file))
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to export annotations: {str(e)}")
+        self.annotation_store.close()
+        self.root.destroy()
 
 def main():
+    parser = argparse.ArgumentParser(
+        description='Annotate the recordings in wavStore. Every save goes to annotation.db; annotation.csv is '
+                    'written on close and picked up again on start when it was edited by hand.')
+    parser.add_argument('--no-prefill', action='store_true',
+                        help='start every clip with an empty text box instead of the best model hypothesis')
+    parser.add_argument('--order', choices=['name', 'disagreement'], default='name',
+                        help='annotate files by name, or those the models transcribe most differently first')
+    parser.add_argument('--recognizer', metavar='BACKEND:MODEL',
+                        help='transcribe files without a hypothesis in the background, '
+                             'e.g. vosk:vosk-model-small-de-0.15')
+    args = parser.parse_args()
+    recognizer = tuple(args.recognizer.split(':', 1)) if args.recognizer else None
+    
     # Create and run the application
     root = tk.Tk()
-    app = AudioAnnotationGUI(root)
+    app = AudioAnnotationGUI(root, prefill=not args.no_prefill, order=args.order, recognizer=recognizer)
+    root.protocol("WM_DELETE_WINDOW", app.close)
     
     # Add help text
     help_text = """
@@ -0,0 +1,49 @@
+import os
+import wave
+
+import numpy as np
+
+from benchmarks.profiling import NULL_TIMER, StageTimer
+
+# Every recognizer backend consumes 16 kHz mono int16 PCM
+SAMPLE_RATE = 16000
+
+
+def resample(pcm: np.ndarray, source_rate: int, target_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Linearly resample int16 PCM to target_rate."""
+    if source_rate == target_rate or len(pcm) == 0:
+        return pcm
+    num_samples = int(round(len(pcm) * target_rate / source_rate))
+    positions = np.arange(num_samples) * (source_rate / target_rate)
+    resampled = np.interp(positions, np.arange(len(pcm)), pcm.astype(np.float32))
+    return np.clip(np.round(resampled), -32768, 32767).astype(np.int16)
+
+
+def read_wav(path: str, sample_rate: int = SAMPLE_RATE, timer: StageTimer = NULL_TIMER) -> np.ndarray:
+    """Read a 16-bit PCM WAV file as mono int16 samples at sample_rate."""
+    with timer.stage('read'):
+        with wave.open(path, 'rb') as wf:
+            if wf.getsampwidth() != 2:
+                raise ValueError(f"{path}: expected 16-bit PCM, got {8 * wf.getsampwidth()}-bit")
+            channels = wf.getnchannels()
+            source_rate = wf.getframerate()
+            pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype='<i2')
+    with timer.stage('resample'):
+        if channels > 1:
+            pcm = pcm.reshape(-1, channels).mean(axis=1).astype(np.int16)
+        return resample(pcm, source_rate, sample_rate)
+
+
+def to_float32(pcm: np.ndarray) -> np.ndarray:
+    """Scale int16 PCM to float32 in [-1, 1), the input format Whisper expects."""
+    return pcm.astype(np.float32) / 32768.0
+
+
+class WavDirectory:
+    """Audio source that decodes files straight from the corpus directory."""
+
+    def __init__(self, wav_dir: str):
+        self.wav_dir = wav_dir
+
+    def load(self, file_name: str, timer: StageTimer = NULL_TIMER) -> np.ndarray:
+        return read_wav(os.path.join(self.wav_dir, file_name), timer=timer)
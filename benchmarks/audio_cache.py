@@ -0,0 +1,161 @@
+import argparse
+import hashlib
+import os
+from contextlib import contextmanager
+from typing import Dict, List
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.audio import SAMPLE_RATE, read_wav
+from benchmarks.profiling import NULL_TIMER, StageTimer
+
+# Decoded corpus shared by all benchmark runs, e.g.
+#   python -m benchmarks.audio_cache --wav-dir ./wavStore/ --cache-dir ./audio_cache/
+#
+# samples.int16 holds the 16 kHz mono int16 samples of every file back to
+# back; index.csv maps file_name and content hash to an offset and length.
+
+INDEX_COLUMNS = ['file_name', 'sha1', 'size', 'mtime', 'offset', 'length']
+
+
+def file_sha1(path: str) -> str:
+    """Content hash of a file."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class AudioCache:
+    """Zero-copy reader for a decoded-audio cache directory."""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.index = read_index(cache_dir).set_index('file_name')
+        self._samples = None
+
+    @property
+    def samples(self) -> np.ndarray:
+        # Mapped lazily so the cache can be handed to spawned worker processes
+        if self._samples is None:
+            path = os.path.join(self.cache_dir, 'samples.int16')
+            if os.path.getsize(path) == 0:
+                self._samples = np.empty(0, dtype=np.int16)
+            else:
+                self._samples = np.memmap(path, dtype=np.int16, mode='r')
+        return self._samples
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_samples'] = None
+        return state
+
+    def __contains__(self, file_name: str) -> bool:
+        return file_name in self.index.index
+
+    def load(self, file_name: str, timer: StageTimer = NULL_TIMER) -> np.ndarray:
+        """Samples of one file as a read-only view into the memory map."""
+        # Pages are only touched by the recognizer, so this mostly times the index lookup
+        with timer.stage('read'):
+            entry = self.index.loc[file_name]
+            offset, length = int(entry['offset']), int(entry['length'])
+            return self.samples[offset:offset + length]
+
+
+def read_index(cache_dir: str) -> pd.DataFrame:
+    """The cache index, empty if the cache does not exist yet."""
+    path = os.path.join(cache_dir, 'index.csv')
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=INDEX_COLUMNS)
+    return pd.read_csv(path, dtype={'file_name': str, 'sha1': str}, float_precision='round_trip')
+
+
+@contextmanager
+def exclusive_lock(path: str):
+    """Hold an exclusive lock on path (created if missing) so concurrent runs update shared files in turn."""
+    with open(path, 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def update_cache(wav_dir: str, cache_dir: str, wav_files: List[str] = None) -> AudioCache:
+    """
+    Decode every file of wav_dir (or only wav_files) that is new or whose
+    content hash changed and append it to the cache. Files whose size and
+    mtime are unchanged are not rehashed. Returns a reader for the updated cache.
+    Concurrent updates, e.g. from parallel shards, wait for each other.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    # The index and the end of the samples file are only read under the lock,
+    # so every run appends after the others and keeps their entries
+    with exclusive_lock(os.path.join(cache_dir, 'lock')):
+        return _update_cache(wav_dir, cache_dir, wav_files)
+
+
+def _update_cache(wav_dir: str, cache_dir: str, wav_files: List[str] = None) -> AudioCache:
+    samples_path = os.path.join(cache_dir, 'samples.int16')
+    index = read_index(cache_dir)
+    if not os.path.exists(samples_path):
+        index = index.iloc[0:0]
+    known: Dict[str, dict] = {row['file_name']: row for row in index.to_dict('records')}
+
+    entries = []
+    if wav_files is None:
+        # A full scan also forgets files that were removed from wav_dir
+        wav_files = sorted(f for f in os.listdir(wav_dir) if f.endswith('.wav'))
+    else:
+        requested = set(wav_files)
+        entries = [entry for name, entry in known.items() if name not in requested]
+    reused = len(entries)
+    decoded = 0
+    with open(samples_path, 'ab') as samples:
+        offset = samples.tell() // 2
+        for wav_file in wav_files:
+            path = os.path.join(wav_dir, wav_file)
+            stat = os.stat(path)
+            entry = known.get(wav_file)
+            if entry is not None and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                entries.append(entry)
+                continue
+            sha1 = file_sha1(path)
+            if entry is not None and entry['sha1'] == sha1:
+                entries.append(dict(entry, size=stat.st_size, mtime=stat.st_mtime))
+                continue
+            pcm = read_wav(path, SAMPLE_RATE)
+            samples.write(pcm.astype('<i2').tobytes())
+            entries.append({'file_name': wav_file, 'sha1': sha1, 'size': stat.st_size,
+                            'mtime': stat.st_mtime, 'offset': offset, 'length': len(pcm)})
+            offset += len(pcm)
+            decoded += 1
+
+    # Replace the index atomically so a crash never leaves it half written
+    index_path = os.path.join(cache_dir, 'index.csv')
+    tmp_path = f'{index_path}.{os.getpid()}.tmp'
+    pd.DataFrame(entries, columns=INDEX_COLUMNS).to_csv(tmp_path, index=False)
+    os.replace(tmp_path, index_path)
+    print(f"Audio cache: decoded {decoded} new or changed files, {len(entries) - reused - decoded} reused")
+    return AudioCache(cache_dir)
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='Decode wavStore once into a shared audio cache')
+    parser.add_argument('--wav-dir', default='./wavStore/', help='directory with the WAV corpus')
+    parser.add_argument('--cache-dir', default='./audio_cache/', help='cache directory')
+    args = parser.parse_args(argv)
+    update_cache(args.wav_dir, args.cache_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import random
+import timeit
+from typing import List, Tuple
+
+from wer import calculate_wer
+
+# Run from the repository root: python -m benchmarks.benchmark_wer
+
+
+def calculate_wer_baseline(reference: List[str], hypothesis: List[str]) -> Tuple[float, int, int, int, int]:
+    """Original full-matrix DP from evaluate.py, kept as the speed and correctness baseline."""
+    ref_len = len(reference)
+    hyp_len = len(hypothesis)
+    dp = [[0] * (hyp_len + 1) for _ in range(ref_len + 1)]
+    for i in range(ref_len + 1):
+        dp[i][0] = i
+    for j in range(hyp_len + 1):
+        dp[0][j] = j
+    for i in range(1, ref_len + 1):
+        for j in range(1, hyp_len + 1):
+            if reference[i-1] == hypothesis[j-1]:
+                dp[i][j] = dp[i-1][j-1]
+            else:
+                dp[i][j] = min(dp[i-1][j] + 1, dp[i][j-1] + 1, dp[i-1][j-1] + 1)
+    i, j = ref_len, hyp_len
+    substitutions = insertions = deletions = 0
+    while i > 0 or j > 0:
+        if i > 0 and j > 0 and reference[i-1] == hypothesis[j-1]:
+            i -= 1
+            j -= 1
+        elif i > 0 and j > 0 and dp[i][j] == dp[i-1][j-1] + 1:
+            substitutions += 1
+            i -= 1
+            j -= 1
+        elif i > 0 and dp[i][j] == dp[i-1][j] + 1:
+            deletions += 1
+            i -= 1
+        else:
+            insertions += 1
+            j -= 1
+    total_errors = substitutions + insertions + deletions
+    wer = total_errors / ref_len if ref_len > 0 else 0.0
+    return wer, substitutions, insertions, deletions, ref_len
+
+
+def make_pair(num_words: int, error_rate: float, rng: random.Random) -> Tuple[List[str], List[str]]:
+    """Build a reference and a hypothesis with roughly `error_rate` edits."""
+    vocabulary = [f"wort{i}" for i in range(200)]
+    reference = [rng.choice(vocabulary) for _ in range(num_words)]
+    hypothesis = []
+    for word in reference:
+        roll = rng.random()
+        if roll < error_rate / 3:
+            continue  # deletion
+        if roll < 2 * error_rate / 3:
+            hypothesis.append(rng.choice(vocabulary))  # substitution
+        else:
+            hypothesis.append(word)
+        if rng.random() < error_rate / 3:
+            hypothesis.append(rng.choice(vocabulary))  # insertion
+    if hypothesis == reference:
+        # Keep short utterances from collapsing to the exact-match fast path
+        hypothesis[num_words // 2] = "fehler"
+    return reference, hypothesis
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'words':>6} {'baseline (us)':>14} {'engine (us)':>12} {'speedup':>8}")
+    for num_words in (4, 8, 16, 64, 256, 1024, 2048):
+        reference, hypothesis = make_pair(num_words, 0.2, rng)
+        assert calculate_wer(reference, hypothesis) == calculate_wer_baseline(reference, hypothesis)
+
+        repeats = max(1, 20000 // num_words) if num_words < 1024 else 1
+        baseline = min(timeit.repeat(lambda: calculate_wer_baseline(reference, hypothesis),
+                                     number=repeats, repeat=3)) / repeats
+        engine = min(timeit.repeat(lambda: calculate_wer(reference, hypothesis),
+                                   number=repeats, repeat=3)) / repeats
+        print(f"{num_words:>6} {baseline * 1e6:>14.1f} {engine * 1e6:>12.1f} {baseline / engine:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import argparse
+import asyncio
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.audio import SAMPLE_RATE, WavDirectory
+from benchmarks.audio_cache import update_cache
+from benchmarks.recognizers import BACKENDS, Recognizer, create_recognizer
+from benchmarks.runner import list_wav_files, load_recognizer, output_path, parse_options
+
+# Throughput vs. load curves, e.g.
+#   python -m benchmarks.loadtest --backend vosk --model vosk-model-small-de-0.15 --instances 4 --concurrency 1,2,4,8,16
+#   python -m benchmarks.loadtest --backend remote --model http://127.0.0.1:8765 --instances 32 --rate 1,2,4,8
+#
+# The model is served by --instances recognizers, each handling one request
+# at a time. Closed-loop levels keep N clients busy back to back; open-loop
+# levels send Poisson arrivals at N requests per second. Every level replays
+# the corpus shuffled and looped, and one row per level is written out.
+# Against the remote backend the instances are client connections; queue
+# delay and service time include what the server reports for its own queue.
+
+LOADTEST_COLUMNS = ['mode', 'level', 'instances', 'requests', 'errors', 'wall_time', 'throughput',
+                    'audio_throughput', 'mean_latency', 'p50_latency', 'p90_latency', 'p99_latency',
+                    'mean_queue_delay', 'p90_queue_delay', 'mean_service_time']
+
+
+class IdleRecognizers:
+    """
+    Idle recognizers handed to waiting requests strictly in arrival order.
+    A released recognizer goes straight to the oldest waiter, so a client
+    that just finished cannot take it again ahead of requests already queued.
+    """
+
+    def __init__(self, recognizers: List[Recognizer]):
+        self.idle = list(recognizers)
+        self.waiters = deque()
+
+    async def acquire(self) -> Recognizer:
+        if self.idle and not self.waiters:
+            return self.idle.pop()
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        return await waiter
+
+    def release(self, recognizer: Recognizer):
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(recognizer)
+                return
+        self.idle.append(recognizer)
+
+
+class LoadGenerator:
+    """Replays a corpus against a pool of loaded recognizers from asyncio."""
+
+    def __init__(self, recognizers: List[Recognizer], pcms: List[np.ndarray], seed: int = 0):
+        self.recognizers = recognizers
+        self.pcms = pcms
+        self.rng = random.Random(seed)
+        self._order = []
+        self.executor = ThreadPoolExecutor(max_workers=len(recognizers))
+
+    def next_pcm(self) -> np.ndarray:
+        """Next utterance of the shuffled, endlessly looped corpus."""
+        if not self._order:
+            self._order = list(range(len(self.pcms)))
+            self.rng.shuffle(self._order)
+        return self.pcms[self._order.pop()]
+
+    async def _request(self, idle: IdleRecognizers, pcm: np.ndarray, records: List[Dict[str, float]]):
+        loop = asyncio.get_running_loop()
+        arrival = time.perf_counter()
+        recognizer = await idle.acquire()
+        start = time.perf_counter()
+        error = False
+        server_queue = server_time = np.nan
+        try:
+            _, server_queue, server_time = await loop.run_in_executor(self.executor, recognizer.transcribe_timed, pcm)
+        except Exception as e:
+            print(f"Request failed: {e}")
+            error = True
+        finally:
+            idle.release(recognizer)
+        end = time.perf_counter()
+        # A server queues requests itself; its queue and recognition times replace what the client can see
+        queue_delay = start - arrival + (0.0 if np.isnan(server_queue) else server_queue)
+        service_time = end - start if np.isnan(server_time) else server_time
+        records.append({'queue_delay': queue_delay, 'service_time': service_time,
+                        'latency': end - arrival, 'audio': len(pcm) / SAMPLE_RATE, 'error': error})
+
+    async def closed_loop(self, concurrency: int, num_requests: int) -> List[Dict[str, float]]:
+        """concurrency clients each send their next request as soon as the previous one returns."""
+        idle = IdleRecognizers(self.recognizers)
+        records = []
+        remaining = [num_requests]
+
+        async def client():
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                await self._request(idle, self.next_pcm(), records)
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return records
+
+    async def open_loop(self, rate: float, num_requests: int) -> List[Dict[str, float]]:
+        """Poisson arrivals at rate requests per second, independent of how fast requests finish."""
+        idle = IdleRecognizers(self.recognizers)
+        records = []
+        tasks = []
+        next_arrival = time.perf_counter()
+        for _ in range(num_requests):
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(self._request(idle, self.next_pcm(), records)))
+            next_arrival += self.rng.expovariate(rate)
+        await asyncio.gather(*tasks)
+        return records
+
+    def run_level(self, mode: str, level: float, num_requests: int) -> Dict[str, float]:
+        """Run one load level and summarize it."""
+        start = time.perf_counter()
+        if mode == 'concurrency':
+            records = asyncio.run(self.closed_loop(int(level), num_requests))
+        else:
+            records = asyncio.run(self.open_loop(level, num_requests))
+        wall_time = time.perf_counter() - start
+        return summarize_level(mode, level, len(self.recognizers), pd.DataFrame(records), wall_time)
+
+
+def summarize_level(mode: str, level: float, instances: int, records: pd.DataFrame,
+                    wall_time: float) -> Dict[str, float]:
+    """Throughput, latency percentiles and queueing delay of one load level."""
+    ok = records[~records['error']]
+    latency = ok['latency'].to_numpy()
+    p50, p90, p99 = np.percentile(latency, [50, 90, 99]) if len(latency) else (np.nan,) * 3
+    return {
+        'mode': mode,
+        'level': level,
+        'instances': instances,
+        'requests': len(records),
+        'errors': int(records['error'].sum()),
+        'wall_time': wall_time,
+        'throughput': len(ok) / wall_time,
+        'audio_throughput': ok['audio'].sum() / wall_time,
+        'mean_latency': latency.mean() if len(latency) else np.nan,
+        'p50_latency': p50,
+        'p90_latency': p90,
+        'p99_latency': p99,
+        'mean_queue_delay': ok['queue_delay'].mean(),
+        'p90_queue_delay': ok['queue_delay'].quantile(0.9),
+        'mean_service_time': ok['service_time'].mean(),
+    }
+
+
+def parse_levels(levels: str) -> List[float]:
+    return [float(level) for level in levels.split(',') if level.strip()]
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='Measure throughput and latency under increasing load')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), required=True, help='recognizer backend')
+    parser.add_argument('--model', required=True, help='model name, path or server URL passed to the backend')
+    parser.add_argument('--option', action='append', default=[], metavar='KEY=VALUE',
+                        help='backend option, may be repeated')
+    parser.add_argument('--wav-dir', default='./wavStore/', help='directory with the WAV corpus')
+    parser.add_argument('--audio-cache', metavar='DIR', help='read audio from a decoded cache')
+    parser.add_argument('--instances', type=int, default=1,
+                        help='recognizers serving requests (connections for the remote backend)')
+    levels = parser.add_mutually_exclusive_group(required=True)
+    levels.add_argument('--concurrency', help='closed-loop levels: comma separated client counts')
+    levels.add_argument('--rate', help='open-loop levels: comma separated requests per second')
+    parser.add_argument('--requests', type=int, default=100, help='requests per level')
+    parser.add_argument('--seed', type=int, default=0, help='seed for shuffling and arrivals')
+    parser.add_argument('--output', help='results CSV (default: ./loadtest_<model>.csv)')
+    args = parser.parse_args(argv)
+
+    wav_files = list_wav_files(args.wav_dir)
+    audio = update_cache(args.wav_dir, args.audio_cache, wav_files) if args.audio_cache else WavDirectory(args.wav_dir)
+    pcms = [audio.load(wav_file) for wav_file in wav_files]
+
+    options = parse_options(args.option)
+    recognizers = []
+    for _ in range(args.instances):
+        recognizer = create_recognizer(args.backend, args.model, **options)
+        load_recognizer(recognizer)
+        # One untimed request per instance so no level pays the cold start
+        recognizer.transcribe(pcms[0])
+        recognizers.append(recognizer)
+
+    generator = LoadGenerator(recognizers, pcms, args.seed)
+    mode = 'concurrency' if args.concurrency else 'rate'
+    rows = []
+    for level in parse_levels(args.concurrency or args.rate):
+        row = generator.run_level(mode, level, args.requests)
+        rows.append(row)
+        print(f"{mode} {level:g}: {row['throughput']:.2f} req/s, {row['audio_throughput']:.2f} audio s / wall s, "
+              f"p50 {row['p50_latency']:.3f} s, p99 {row['p99_latency']:.3f} s, "
+              f"queue {row['mean_queue_delay']:.3f} s")
+    generator.executor.shutdown()
+
+    default_output = output_path(args.model).replace('transcripts_', 'loadtest_')
+    pd.DataFrame(rows, columns=LOADTEST_COLUMNS).to_csv(args.output or default_output, index=False)
+
+
+if __name__ == "__main__":
+    main()
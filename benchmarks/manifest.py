@@ -0,0 +1,158 @@
+import argparse
+import hashlib
+import io
+import os
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.audio import SAMPLE_RATE
+from benchmarks.audio_cache import exclusive_lock
+
+# Content-addressed description of the corpus, e.g.
+#   python -m benchmarks.manifest --wav-dir ./wavStore/
+#
+# wavStore.manifest.csv, next to the corpus rather than inside its submodule,
+# holds one row per WAV file with its SHA-1, duration, format and RMS level. Files whose size and mtime are unchanged are not read
+# again, so updating the manifest after adding recordings is cheap.
+#
+# status is 'ok' for 16 kHz mono 16-bit PCM, 'convert' for other 16-bit PCM
+# that read_wav resamples and mixes down, 'incompatible' for sample widths
+# the benchmarks cannot read and 'corrupt' for unreadable or truncated files.
+# duplicate_of names the first file with identical content.
+
+MANIFEST_SUFFIX = '.manifest.csv'
+MANIFEST_COLUMNS = ['file_name', 'sha1', 'size', 'mtime', 'duration', 'sample_rate', 'channels',
+                    'sample_width', 'rms_db', 'status', 'duplicate_of']
+USABLE_STATUS = ('ok', 'convert')
+
+
+def manifest_path(wav_dir: str) -> str:
+    """./wavStore/ -> ./wavStore.manifest.csv"""
+    return os.path.normpath(wav_dir) + MANIFEST_SUFFIX
+
+
+def probe_file(path: str) -> Dict[str, object]:
+    """Hash a WAV file and read its format and RMS level, reading the file once."""
+    stat = os.stat(path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    row = {'file_name': os.path.basename(path), 'sha1': hashlib.sha1(data).hexdigest(),
+           'size': stat.st_size, 'mtime': stat.st_mtime, 'duration': np.nan, 'sample_rate': np.nan,
+           'channels': np.nan, 'sample_width': np.nan, 'rms_db': np.nan, 'status': 'corrupt'}
+    try:
+        with wave.open(io.BytesIO(data), 'rb') as wf:
+            channels, width, rate, frames = wf.getnchannels(), wf.getsampwidth(), wf.getframerate(), wf.getnframes()
+            frames_data = wf.readframes(frames)
+    except (wave.Error, EOFError) as e:
+        print(f"{path}: {e}")
+        return row
+    row.update(duration=frames / rate if rate else np.nan, sample_rate=rate, channels=channels, sample_width=width)
+    if len(frames_data) < frames * channels * width:
+        print(f"{path}: truncated, {len(frames_data)} of {frames * channels * width} bytes of audio")
+        return row
+    if width != 2:
+        row['status'] = 'incompatible'
+        return row
+    pcm = np.frombuffer(frames_data, dtype='<i2').astype(np.float32)
+    rms = np.sqrt(np.mean(pcm ** 2)) / 32768.0 if len(pcm) else 0.0
+    row['rms_db'] = 20 * np.log10(max(rms, 1e-10))
+    row['status'] = 'ok' if rate == SAMPLE_RATE and channels == 1 else 'convert'
+    return row
+
+
+def read_manifest(wav_dir: str) -> pd.DataFrame:
+    """The manifest of wav_dir, empty if it has not been built yet."""
+    path = manifest_path(wav_dir)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=MANIFEST_COLUMNS)
+    # round_trip parsing keeps mtimes exactly as written so unchanged files compare equal
+    return pd.read_csv(path, dtype={'file_name': str, 'sha1': str, 'status': str, 'duplicate_of': str},
+                       keep_default_na=False, na_values={'duration': [''], 'sample_rate': [''], 'channels': [''],
+                                                         'sample_width': [''], 'rms_db': ['']},
+                       float_precision='round_trip')
+
+
+def update_manifest(wav_dir: str, workers: int = None) -> pd.DataFrame:
+    """
+    Bring the manifest of wav_dir up to date: probe new and changed files in
+    parallel, keep rows of unchanged files and drop rows of removed ones.
+    Returns the manifest sorted by file name. Concurrent updates, e.g. from
+    runners started together, wait for each other.
+    """
+    with exclusive_lock(manifest_path(wav_dir) + '.lock'):
+        return _update_manifest(wav_dir, workers)
+
+
+def _update_manifest(wav_dir: str, workers: int = None) -> pd.DataFrame:
+    known = {row['file_name']: row for row in read_manifest(wav_dir).to_dict('records')}
+    rows, changed = [], []
+    for wav_file in sorted(f for f in os.listdir(wav_dir) if f.endswith('.wav')):
+        stat = os.stat(os.path.join(wav_dir, wav_file))
+        entry = known.get(wav_file)
+        if entry is not None and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            rows.append(entry)
+        else:
+            changed.append(os.path.join(wav_dir, wav_file))
+
+    if changed:
+        if workers is None:
+            workers = min(len(changed), os.cpu_count() or 1)
+        if workers <= 1:
+            rows += [probe_file(path) for path in changed]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                rows += list(pool.map(probe_file, changed, chunksize=16))
+
+    manifest = pd.DataFrame(rows, columns=MANIFEST_COLUMNS).sort_values('file_name', ignore_index=True)
+    # The first file of every content hash is the original, the others point at it
+    first = manifest.groupby('sha1')['file_name'].transform('first')
+    manifest['duplicate_of'] = np.where(first != manifest['file_name'], first, '')
+
+    # Replace the manifest atomically so a crash never leaves it half written
+    path = manifest_path(wav_dir)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    manifest.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    print(f"Manifest: probed {len(changed)} new or changed files, {len(manifest) - len(changed)} unchanged")
+    return manifest
+
+
+def usable_files(manifest: pd.DataFrame) -> List[str]:
+    """Files the benchmarks can read, warning about the ones left out."""
+    usable = manifest['status'].isin(USABLE_STATUS)
+    for row in manifest[~usable].itertuples(index=False):
+        print(f"Skipping {row.file_name}: {row.status}")
+    return manifest.loc[usable, 'file_name'].tolist()
+
+
+def print_summary(manifest: pd.DataFrame):
+    """Corpus size and formats, then every file that needs attention."""
+    print(f"{len(manifest)} files, {manifest['duration'].sum() / 3600:.2f} h of audio")
+    formats = manifest.groupby(['sample_rate', 'channels', 'sample_width']).size()
+    for (rate, channels, width), count in formats.items():
+        print(f"  {count} files at {rate:g} Hz, {channels:g} channel(s), {8 * width:g}-bit")
+    for status, count in manifest['status'].value_counts().items():
+        if status != 'ok':
+            print(f"  {count} files {status}")
+    duplicates = manifest[manifest['duplicate_of'] != '']
+    for row in duplicates.itertuples(index=False):
+        print(f"  {row.file_name} duplicates {row.duplicate_of}")
+    quiet = manifest[manifest['rms_db'] < -50]
+    for row in quiet.itertuples(index=False):
+        print(f"  {row.file_name} is nearly silent ({row.rms_db:.0f} dBFS)")
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='Build or update the manifest of the WAV corpus')
+    parser.add_argument('--wav-dir', default='./wavStore/', help='directory with the WAV corpus')
+    parser.add_argument('--workers', type=int, default=None, help='probing processes (default: CPU count)')
+    args = parser.parse_args(argv)
+    print_summary(update_manifest(args.wav_dir, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import sys
+import wave
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def wav_duration(path: str) -> float:
+    """Audio length in seconds, read from the WAV header only."""
+    with wave.open(path, 'rb') as wf:
+        return wf.getnframes() / wf.getframerate()
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far in MB, NaN if unavailable."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS and kilobytes everywhere else
+        return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+    try:
+        import psutil
+    except ImportError:
+        return float('nan')
+    info = psutil.Process().memory_info()
+    return getattr(info, 'peak_wset', info.rss) / 1024 ** 2
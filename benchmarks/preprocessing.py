@@ -0,0 +1,153 @@
+import ast
+import inspect
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from benchmarks.audio import SAMPLE_RATE
+
+# Audio preprocessing in front of the recognizers. A pipeline is written as
+# comma separated steps with optional colon separated parameters, e.g.
+#   trim:threshold_db=-35,highpass:cutoff_hz=100,normalize
+# All steps take and return 16 kHz mono int16 PCM.
+
+
+def _to_int16(audio: np.ndarray) -> np.ndarray:
+    return np.clip(np.round(audio), -32768, 32767).astype(np.int16)
+
+
+def _frame_energy_db(pcm: np.ndarray, frame_length: int) -> np.ndarray:
+    """RMS level of consecutive non-overlapping frames in dB full scale."""
+    num_frames = len(pcm) // frame_length
+    frames = pcm[:num_frames * frame_length].astype(np.float32).reshape(num_frames, frame_length)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1)) / 32768.0
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def trim_silence(pcm: np.ndarray, threshold_db: float = -35.0, frame_ms: float = 20.0,
+                 padding_ms: float = 150.0) -> np.ndarray:
+    """
+    Energy VAD: cut leading and trailing frames quieter than threshold_db
+    relative to the loudest frame, keeping padding_ms around the speech.
+    """
+    frame_length = int(SAMPLE_RATE * frame_ms / 1000)
+    energy = _frame_energy_db(pcm, frame_length)
+    if len(energy) == 0:
+        return pcm
+    voiced = np.flatnonzero(energy >= energy.max() + threshold_db)
+    padding = int(SAMPLE_RATE * padding_ms / 1000)
+    start = max(voiced[0] * frame_length - padding, 0)
+    stop = min((voiced[-1] + 1) * frame_length + padding, len(pcm))
+    return pcm[start:stop]
+
+
+def normalize_gain(pcm: np.ndarray, target_db: float = -20.0, max_gain_db: float = 30.0) -> np.ndarray:
+    """Scale to target_db RMS, limiting the gain and keeping peaks below full scale."""
+    if len(pcm) == 0:
+        return pcm
+    audio = pcm.astype(np.float32)
+    rms = np.sqrt(np.mean(audio ** 2))
+    peak = np.abs(audio).max()
+    if rms == 0:
+        return pcm
+    gain = min(10 ** (target_db / 20) * 32768.0 / rms, 10 ** (max_gain_db / 20), 32767.0 / peak)
+    return _to_int16(audio * gain)
+
+
+def highpass(pcm: np.ndarray, cutoff_hz: float = 80.0, order: int = 2) -> np.ndarray:
+    """Zero-phase Butterworth-magnitude high-pass filter applied in the frequency domain."""
+    if len(pcm) == 0:
+        return pcm
+    spectrum = np.fft.rfft(pcm.astype(np.float32))
+    freqs = np.fft.rfftfreq(len(pcm), 1 / SAMPLE_RATE)
+    with np.errstate(divide='ignore'):
+        response = 1 / np.sqrt(1 + (cutoff_hz / freqs) ** (2 * order))
+    response[0] = 0.0
+    return _to_int16(np.fft.irfft(spectrum * response, n=len(pcm)))
+
+
+def denoise(pcm: np.ndarray, reduction_db: float = 12.0, noise_percentile: float = 10.0,
+            frame_length: int = 512) -> np.ndarray:
+    """
+    Spectral gating: estimate a stationary noise floor per frequency bin from
+    the quietest frames and attenuate bins that do not rise above it.
+    Uses a sqrt-Hann STFT with 50% overlap, which reconstructs exactly.
+    """
+    hop = frame_length // 2
+    if len(pcm) < frame_length:
+        return pcm
+    num_frames = -(-len(pcm) // hop) + 1
+    padded = np.zeros((num_frames + 1) * hop, dtype=np.float32)
+    padded[hop:hop + len(pcm)] = pcm
+    # Frames k cover blocks k and k+1 of the padded signal
+    blocks = padded.reshape(-1, hop)
+    frames = np.concatenate([blocks[:-1], blocks[1:]], axis=1)
+    window = np.sqrt(np.hanning(frame_length + 1)[:-1]).astype(np.float32)
+
+    spectra = np.fft.rfft(frames * window, axis=1)
+    magnitude = np.abs(spectra)
+    noise = np.percentile(magnitude, noise_percentile, axis=0)
+    floor = 10 ** (-reduction_db / 20)
+    gain = np.clip(1 - 2 * noise / np.maximum(magnitude, 1e-10), floor, 1.0)
+    filtered = np.fft.irfft(spectra * gain, n=frame_length, axis=1) * window
+
+    # Overlap-add the two halves of every frame back onto the blocks
+    out = np.zeros_like(blocks)
+    out[:-1] += filtered[:, :hop]
+    out[1:] += filtered[:, hop:]
+    return _to_int16(out.reshape(-1)[hop:hop + len(pcm)])
+
+
+STEPS: Dict[str, Callable[..., np.ndarray]] = {
+    'trim': trim_silence,
+    'normalize': normalize_gain,
+    'highpass': highpass,
+    'denoise': denoise,
+}
+
+
+def parse_pipeline(spec: str) -> List[Tuple[str, Dict[str, float]]]:
+    """Parse 'step:key=value,step' into (step, parameters) pairs."""
+    steps = []
+    for part in filter(None, (part.strip() for part in (spec or '').split(','))):
+        name, *params = part.split(':')
+        if name not in STEPS:
+            raise ValueError(f"Unknown preprocessing step {name!r}, choose from {', '.join(STEPS)}")
+        kwargs = {}
+        for param in params:
+            key, sep, value = param.partition('=')
+            if not sep:
+                raise ValueError(f"Preprocessing parameter {param!r} is not of the form key=value")
+            try:
+                kwargs[key] = ast.literal_eval(value)
+            except (ValueError, SyntaxError):
+                raise ValueError(f"Preprocessing parameter {param!r} needs a number as its value") from None
+        # Catch misspelled parameters now rather than on the first file, possibly inside a worker
+        try:
+            inspect.signature(STEPS[name]).bind(None, **kwargs)
+        except TypeError as e:
+            raise ValueError(f"Preprocessing step {name!r}: {e}; parameters are "
+                             f"{', '.join(list(inspect.signature(STEPS[name]).parameters)[1:])}") from None
+        steps.append((name, kwargs))
+    return steps
+
+
+class Preprocessor:
+    """A parsed preprocessing pipeline; calling it runs every step in order."""
+
+    def __init__(self, spec: str = ''):
+        self.steps = parse_pipeline(spec)
+
+    def __bool__(self) -> bool:
+        return bool(self.steps)
+
+    def __call__(self, pcm: np.ndarray) -> np.ndarray:
+        for name, kwargs in self.steps:
+            pcm = STEPS[name](pcm, **kwargs)
+        return pcm
+
+    @property
+    def description(self) -> str:
+        """Canonical spec recorded with the results; empty without preprocessing."""
+        return ','.join(':'.join([name] + [f'{key}={value}' for key, value in sorted(kwargs.items())])
+                        for name, kwargs in self.steps)
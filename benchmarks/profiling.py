@@ -0,0 +1,107 @@
+import cProfile
+import glob
+import os
+import pstats
+import time
+from contextlib import contextmanager
+from multiprocessing.util import Finalize
+from typing import Dict, List
+
+# Opt-in instrumentation of the transcription hot path, e.g.
+#   python -m benchmarks.runner --backend vosk --model <name> --profile-stages --profile
+#
+# --profile-stages adds per-file seconds for every stage below to the
+# transcripts CSV and evaluate.py reports the breakdown per model. Stages
+# record self time: a stage nested in another (resampling while reading a
+# file) is not counted twice.
+# --profile writes a cProfile dump per model next to the CSV, merged across
+# worker processes; inspect it with python -m pstats or snakeviz.
+# For native frames sample from outside instead:
+#   py-spy record --subprocesses -o profile.svg -- python -m benchmarks.runner ...
+
+STAGES = ['read', 'resample', 'preprocess', 'features', 'inference', 'parse']
+STAGE_COLUMNS = [f'{stage}_time' for stage in STAGES]
+
+
+class StageTimer:
+    """Wall time per pipeline stage, accumulated until taken. A disabled timer only checks a flag."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.totals: Dict[str, float] = {}
+        # Time spent in nested stages of every stage currently open
+        self._children: List[float] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        self._children.append(0.0)
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start_time
+            children = self._children.pop()
+            self.totals[name] = self.totals.get(name, 0.0) + elapsed - children
+            if self._children:
+                self._children[-1] += elapsed
+
+    def take(self) -> Dict[str, float]:
+        """Seconds per stage since the last call, resetting the totals."""
+        totals, self.totals = self.totals, {}
+        return totals
+
+
+NULL_TIMER = StageTimer()
+
+
+def per_file_stages(totals: Dict[str, float], num_files: int) -> Dict[str, float]:
+    """A batch's stage totals as per-file transcripts columns, shared equally like the batch duration."""
+    return {f'{stage}_time': totals.get(stage, 0.0) / num_files for stage in STAGES}
+
+
+class HotPathProfiler:
+    """
+    cProfile of the transcription calls of one process. Each process dumps
+    its part when it exits (or on dump()); merge() combines the parts.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._profile = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_profile'] = None
+        return state
+
+    @contextmanager
+    def profile(self):
+        if self._profile is None:
+            self._profile = cProfile.Profile()
+            # Pool workers run their finalizers on a clean exit, the parent calls dump() itself
+            Finalize(None, self.dump, exitpriority=10)
+        self._profile.enable()
+        try:
+            yield
+        finally:
+            self._profile.disable()
+
+    def dump(self):
+        """Write this process's part; later calls start a new one instead of writing it again."""
+        if self._profile is not None:
+            self._profile.dump_stats(f'{self.path}.{os.getpid()}')
+            self._profile = None
+
+    def merge(self) -> str:
+        """Combine the dumps of all processes into self.path and remove them."""
+        parts = sorted(glob.glob(glob.escape(self.path) + '.*[0-9]'))
+        if not parts:
+            return None
+        stats = pstats.Stats(*parts)
+        stats.dump_stats(self.path)
+        for part in parts:
+            os.remove(part)
+        return self.path
@@ -0,0 +1,271 @@
+import hashlib
+import http.client
+import json
+import os
+import time
+from typing import Dict, List, Tuple, Type
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from benchmarks.audio import SAMPLE_RATE, to_float32
+from benchmarks.profiling import StageTimer
+
+
+class Recognizer:
+    """
+    Interface shared by all speech recognition backends.
+    Audio is passed as 16 kHz mono int16 PCM in a NumPy array.
+    """
+
+    backend = ''
+    supports_streaming = False
+    # Whether a model loaded in the parent can be inherited by forked workers
+    fork_safe = False
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        # Cold-start bookkeeping filled in by the benchmark runner
+        self.load_time = float('nan')
+        self.rss_after_load_mb = float('nan')
+        self.files_transcribed = 0
+        # Stage timings and a HotPathProfiler, enabled by the runner's --profile-stages and --profile
+        self.timer = StageTimer()
+        self.profiler = None
+
+    def load(self):
+        """Load the model. Called once before the first transcription."""
+
+    def transcribe(self, pcm: np.ndarray) -> str:
+        """Transcribe a complete utterance."""
+        raise NotImplementedError
+
+    def transcribe_timed(self, pcm: np.ndarray) -> Tuple[str, float, float]:
+        """
+        (transcript, queue time, recognition time), the times as reported by
+        backends that queue requests themselves and NaN for all others.
+        """
+        return self.transcribe(pcm), float('nan'), float('nan')
+
+    def transcribe_batch(self, pcms: List[np.ndarray]) -> List[str]:
+        """Transcribe several utterances; backends that can decode them together override this."""
+        return [self.transcribe(pcm) for pcm in pcms]
+
+    def start_stream(self):
+        """Begin a new streaming utterance."""
+        raise NotImplementedError(f"{self.backend} does not support streaming")
+
+    def feed(self, pcm: np.ndarray) -> str:
+        """Feed the next chunk of a streaming utterance and return the text recognized so far."""
+        raise NotImplementedError(f"{self.backend} does not support streaming")
+
+    def finish_stream(self) -> str:
+        """End the streaming utterance and return the final text."""
+        raise NotImplementedError(f"{self.backend} does not support streaming")
+
+
+class VoskRecognizer(Recognizer):
+    """Kaldi recognizer from vosk; model_name is a downloadable model name or a local model directory."""
+
+    backend = 'vosk'
+    supports_streaming = True
+    fork_safe = True
+
+    def __init__(self, model_name: str, chunk_frames: int = 4000):
+        super().__init__(model_name)
+        self.chunk_frames = chunk_frames
+        self.model = None
+        self.rec = None
+        self._segments = []
+
+    def load(self):
+        from vosk import Model, KaldiRecognizer, SetLogLevel
+
+        SetLogLevel(-1)  # Suppress Vosk logs
+        if os.path.isdir(self.model_name):
+            self.model = Model(model_path=self.model_name)
+        else:
+            self.model = Model(model_name=self.model_name)
+        self.rec = KaldiRecognizer(self.model, SAMPLE_RATE)
+        self.rec.SetWords(True)  # Enable word-level timestamps
+        self.rec.SetPartialWords(True)  # Enable partial words
+
+    def transcribe(self, pcm: np.ndarray) -> str:
+        # Kaldi computes features and decodes as the audio arrives, so both count as inference
+        with self.timer.stage('inference'):
+            for start in range(0, len(pcm), self.chunk_frames):
+                self.rec.AcceptWaveform(pcm[start:start + self.chunk_frames].tobytes())
+            result = self.rec.FinalResult()
+        with self.timer.stage('parse'):
+            return json.loads(result)['text']
+
+    def start_stream(self):
+        # FinalResult() resets the recognizer, so only the finished segments need clearing
+        self._segments = []
+
+    def feed(self, pcm: np.ndarray) -> str:
+        # At an endpoint Kaldi finalizes the segment and the next partial starts empty
+        if self.rec.AcceptWaveform(pcm.tobytes()):
+            self._segments.append(json.loads(self.rec.Result())['text'])
+            partial = ''
+        else:
+            partial = json.loads(self.rec.PartialResult())['partial']
+        return ' '.join(text for text in self._segments + [partial] if text)
+
+    def finish_stream(self) -> str:
+        final = json.loads(self.rec.FinalResult())['text']
+        return ' '.join(text for text in self._segments + [final] if text)
+
+
+class WhisperRecognizer(Recognizer):
+    """
+    openai-whisper model; extra options are passed through to model.transcribe.
+    Batches decode one padded 30 s log-mel segment per file in a single call
+    with the language pinned (German unless a language option is given).
+    """
+
+    backend = 'whisper'
+
+    def __init__(self, model_name: str, **options):
+        super().__init__(model_name)
+        self.options = options
+        self.model = None
+
+    def load(self):
+        import whisper
+
+        self.model = whisper.load_model(self.model_name)
+
+    def transcribe(self, pcm: np.ndarray) -> str:
+        with self.timer.stage('features'):
+            audio = to_float32(pcm)
+        # model.transcribe computes the log-mel windows itself, so they count as inference
+        with self.timer.stage('inference'):
+            return self.model.transcribe(audio, **self.options)['text']
+
+    def transcribe_batch(self, pcms: List[np.ndarray]) -> List[str]:
+        import torch
+        import whisper
+
+        texts = [None] * len(pcms)
+        # Only audio that fits into one 30 s window can share a batch
+        batched = [k for k, pcm in enumerate(pcms) if len(pcm) <= whisper.audio.N_SAMPLES]
+        for k in set(range(len(pcms))) - set(batched):
+            texts[k] = self.transcribe(pcms[k])
+        if not batched:
+            return texts
+
+        # Mel normalization uses the global maximum, so each file gets its own spectrogram
+        with self.timer.stage('features'):
+            mel = torch.stack([
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(to_float32(pcms[k])),
+                                            n_mels=self.model.dims.n_mels, device=self.model.device)
+                for k in batched
+            ])
+        options = whisper.DecodingOptions(
+            language=self.options.get('language', 'de'),
+            fp16=self.options.get('fp16', self.model.device.type != 'cpu'),
+            without_timestamps=True,
+        )
+        with self.timer.stage('inference'):
+            results = whisper.decode(self.model, mel, options)
+        for k, result in zip(batched, results):
+            texts[k] = result.text
+        return texts
+
+
+class FakeRecognizer(Recognizer):
+    """
+    Deterministic stand-in backend for exercising the runner without a model.
+    The transcript is derived from the audio content, and processing can be
+    slowed to a fixed real-time factor to mimic a real decoder.
+    """
+
+    backend = 'fake'
+    supports_streaming = True
+    fork_safe = True
+
+    def __init__(self, model_name: str = 'fake', rtf: float = 0.0):
+        super().__init__(model_name)
+        self.rtf = float(rtf)
+        self._stream = []
+
+    def transcribe(self, pcm: np.ndarray) -> str:
+        with self.timer.stage('inference'):
+            if self.rtf > 0:
+                time.sleep(self.rtf * len(pcm) / SAMPLE_RATE)
+            digest = hashlib.sha1(pcm.tobytes()).hexdigest()[:8]
+        return f"fake {len(pcm)} {digest}"
+
+    def start_stream(self):
+        self._stream = []
+
+    def feed(self, pcm: np.ndarray) -> str:
+        self._stream.append(pcm)
+        # The first word of the final transcript, so partials are stable
+        return 'fake' if any(len(chunk) for chunk in self._stream) else ''
+
+    def finish_stream(self) -> str:
+        pcm = np.concatenate(self._stream) if self._stream else np.empty(0, dtype=np.int16)
+        self._stream = []
+        return self.transcribe(pcm)
+
+
+class RemoteRecognizer(Recognizer):
+    """
+    Client for a recognizer served by benchmarks.server; model_name is the
+    server URL. Timings therefore cover the whole request round trip.
+    """
+
+    backend = 'remote'
+
+    def __init__(self, model_name: str = 'http://127.0.0.1:8765', timeout: float = 600.0):
+        super().__init__(model_name)
+        self.timeout = timeout
+        self.connection = None
+
+    def load(self):
+        # One persistent connection per client; it must not be shared across forks
+        url = urlsplit(self.model_name)
+        self.connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=self.timeout)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['connection'] = None
+        return state
+
+    def request(self, method: str, path: str, body: bytes = None, content_type: str = None) -> dict:
+        headers = {'Content-Type': content_type} if content_type else {}
+        # The server's own stages are not visible here, the round trip counts as inference
+        with self.timer.stage('inference'):
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            body = response.read()
+        with self.timer.stage('parse'):
+            payload = json.loads(body)
+        if response.status != 200:
+            raise RuntimeError(f"{self.model_name}{path}: {response.status} {payload.get('error')}")
+        return payload
+
+    def transcribe(self, pcm: np.ndarray) -> str:
+        return self.transcribe_timed(pcm)[0]
+
+    def transcribe_timed(self, pcm: np.ndarray) -> Tuple[str, float, float]:
+        """The transcript with the server's time waiting for a free recognizer and recognizing."""
+        reply = self.request('POST', '/transcribe', pcm.astype('<i2').tobytes(), 'application/octet-stream')
+        return reply['transcript'], reply['queue_time'], reply['duration']
+
+
+BACKENDS: Dict[str, Type[Recognizer]] = {
+    VoskRecognizer.backend: VoskRecognizer,
+    WhisperRecognizer.backend: WhisperRecognizer,
+    FakeRecognizer.backend: FakeRecognizer,
+    RemoteRecognizer.backend: RemoteRecognizer,
+}
+
+
+def create_recognizer(backend: str, model_name: str, **options) -> Recognizer:
+    """Instantiate the recognizer registered for backend."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, choose from {', '.join(BACKENDS)}")
+    return BACKENDS[backend](model_name, **options)
@@ -0,0 +1,95 @@
+import csv
+import hashlib
+import io
+import json
+import os
+from typing import Dict, List
+
+import pandas as pd
+
+
+def config_fingerprint(config: Dict[str, object]) -> str:
+    """Short stable hash of everything that influences the transcripts of a run."""
+    encoded = json.dumps(config, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:12]
+
+
+def _read_complete_rows(path: str) -> pd.DataFrame:
+    """Read a results CSV, ignoring a last line left half written by a crash."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        text = f.read()
+    if text and not text.endswith('\n'):
+        text = text[:text.rfind('\n') + 1]
+    if not text.strip():
+        return pd.DataFrame()
+    return pd.read_csv(io.StringIO(text), dtype={'file_name': str, 'fingerprint': str})
+
+
+class ResultStore:
+    """
+    Append-only transcripts CSV that is written row by row as files finish.
+    Each row carries the fingerprint of the run configuration. When resuming,
+    rows of the same fingerprint are kept and their files skipped; a file
+    holding rows of any other configuration raises ValueError rather than
+    losing them. Without resume the file starts empty.
+    Rows go to <path>.partial until the first new row arrives, which then
+    replaces path; a run that fails before transcribing anything, e.g.
+    because the model does not load, leaves earlier results untouched.
+    """
+
+    def __init__(self, path: str, columns: List[str], fingerprint: str, resume: bool = False):
+        self.path = path
+        self.columns = columns + ['fingerprint']
+        self.fingerprint = fingerprint
+        self.done = set()
+        # Wall-clock time already spent by earlier sessions of this run
+        self.elapsed_offset = 0.0
+
+        kept = pd.DataFrame(columns=self.columns)
+        if resume and os.path.exists(path):
+            existing = _read_complete_rows(path)
+            if 'fingerprint' in existing.columns:
+                others = sorted(set(existing['fingerprint'].dropna()) - {fingerprint})
+            else:
+                # Written before runs were fingerprinted
+                others = [] if existing.empty else ['unknown']
+            if others:
+                raise ValueError(f"{path} holds results of run configuration {', '.join(others)}, not {fingerprint}; "
+                                 f"resume with the same options, write to another --output or run without --resume")
+            if 'fingerprint' in existing.columns:
+                kept = existing[existing['fingerprint'] == fingerprint].reindex(columns=self.columns)
+                self.done = set(kept['file_name'])
+                if 'completed_at' in kept.columns and kept['completed_at'].notna().any():
+                    self.elapsed_offset = float(kept['completed_at'].max())
+
+        # Write the kept rows once, then only append
+        self._current_path = path + '.partial'
+        kept.to_csv(self._current_path, index=False)
+        self._open()
+
+    def _open(self):
+        self._file = open(self._current_path, 'a', encoding='utf-8', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns, extrasaction='ignore')
+
+    def append(self, rows: List[Dict[str, object]]):
+        """Persist finished rows immediately."""
+        for row in rows:
+            self._writer.writerow(dict(row, fingerprint=self.fingerprint))
+            self.done.add(row['file_name'])
+        self._file.flush()
+        if self._current_path != self.path:
+            # The run produced results, so they take the place of the old file
+            self._file.close()
+            os.replace(self._current_path, self.path)
+            self._current_path = self.path
+            self._open()
+
+    def close(self):
+        self._file.close()
+        if self._current_path != self.path:
+            os.remove(self._current_path)
+
+    def read(self) -> pd.DataFrame:
+        """All rows currently in the store."""
+        self._file.flush()
+        return _read_complete_rows(self._current_path)
@@ -0,0 +1,340 @@
+import argparse
+import ast
+import multiprocessing
+import os
+import re
+import time
+from contextlib import nullcontext
+from typing import Dict, List
+
+import pandas as pd
+
+from benchmarks.audio import SAMPLE_RATE, WavDirectory
+from benchmarks.audio_cache import update_cache
+from benchmarks.manifest import update_manifest, usable_files
+from benchmarks.metrics import peak_rss_mb
+from benchmarks.preprocessing import Preprocessor
+from benchmarks.profiling import STAGE_COLUMNS, HotPathProfiler, per_file_stages
+from benchmarks.recognizers import BACKENDS, Recognizer, create_recognizer
+from benchmarks.results import ResultStore, config_fingerprint
+from benchmarks.sharding import parse_shard, shard_files, shard_path
+
+# Run from the repository root, e.g.
+#   python -m benchmarks.runner --backend vosk --model vosk-model-small-de-0.15
+#   python -m benchmarks.runner --backend whisper --model medium --option language=de
+#   python -m benchmarks.runner --backend remote --model http://127.0.0.1:8765 --workers 8
+
+TRANSCRIPT_COLUMNS = ['file_name', 'transcript', 'duration', 'audio_duration', 'peak_rss_mb', 'completed_at',
+                      'preprocessing', 'load_time', 'rss_after_load_mb', 'cold', 'warmup']
+
+
+def list_wav_files(wav_dir: str) -> List[str]:
+    """Names of all WAV files in wav_dir."""
+    return [f for f in os.listdir(wav_dir) if f.endswith('.wav')]
+
+
+def parse_options(options: List[str]) -> Dict[str, object]:
+    """Turn key=value strings into backend keyword arguments, evaluating Python literals."""
+    parsed = {}
+    for option in options:
+        key, sep, value = option.partition('=')
+        if not sep:
+            raise ValueError(f"Option {option!r} is not of the form key=value")
+        try:
+            parsed[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            parsed[key] = value
+    return parsed
+
+
+def load_recognizer(recognizer: Recognizer):
+    """Load the model, recording load time and the memory it took."""
+    start_time = time.perf_counter()
+    recognizer.load()
+    recognizer.load_time = time.perf_counter() - start_time
+    recognizer.rss_after_load_mb = peak_rss_mb()
+
+
+def transcribe_files(recognizer: Recognizer, audio, wav_files: List[str], preprocess: Preprocessor = None,
+                     warmup: int = 0, batched: bool = False) -> List[Dict[str, object]]:
+    """
+    Read, preprocess and transcribe a batch of files, timing all of it together
+    as the original scripts did. Batches share their time equally per file.
+    audio is a WavDirectory or an AudioCache; audio_duration is the length
+    before preprocessing so trimming shows up as a lower real-time factor.
+    The first call of a recognizer is marked cold, and calls until it has seen
+    warmup files are marked warmup so reports can leave them out.
+    In a batched run every batch, even a single leftover file, goes through
+    transcribe_batch so all files are decoded with the same settings.
+    With the recognizer's stage timer enabled, rows also carry the seconds
+    per stage; its profiler, if any, covers everything that is timed.
+    """
+    preprocess = preprocess or Preprocessor()
+    cold = recognizer.files_transcribed == 0
+    is_warmup = recognizer.files_transcribed < warmup
+    timer = recognizer.timer
+    with recognizer.profiler.profile() if recognizer.profiler else nullcontext():
+        start_time = time.perf_counter()
+        pcms = [audio.load(wav_file, timer) for wav_file in wav_files]
+        with timer.stage('preprocess'):
+            inputs = [preprocess(pcm) for pcm in pcms] if preprocess else pcms
+        if len(inputs) == 1 and not batched:
+            transcripts = [recognizer.transcribe(inputs[0])]
+        else:
+            transcripts = recognizer.transcribe_batch(inputs)
+        end_time = time.perf_counter()
+    recognizer.files_transcribed += len(wav_files)
+    duration = (end_time - start_time) / len(wav_files)
+    stages = per_file_stages(timer.take(), len(wav_files)) if timer.enabled else {}
+    peak_rss = peak_rss_mb()
+    return [{
+        'file_name': wav_file,
+        'transcript': transcript,
+        'duration': duration,
+        'audio_duration': len(pcm) / SAMPLE_RATE,
+        'peak_rss_mb': peak_rss,
+        'preprocessing': preprocess.description,
+        'load_time': recognizer.load_time,
+        'rss_after_load_mb': recognizer.rss_after_load_mb,
+        'cold': cold,
+        'warmup': is_warmup,
+        **stages,
+    } for wav_file, pcm, transcript in zip(wav_files, pcms, transcripts)]
+
+
+def make_batches(wav_dir: str, wav_files: List[str], batch_size: int) -> List[List[str]]:
+    """Group files into batches of similar size so batched decoding pads little."""
+    if batch_size <= 1:
+        return [[wav_file] for wav_file in wav_files]
+    ordered = sorted(wav_files, key=lambda f: os.path.getsize(os.path.join(wav_dir, f)))
+    return [ordered[i:i + batch_size] for i in range(0, len(ordered), batch_size)]
+
+
+_worker_recognizer = None
+_worker_audio = None
+_worker_preprocess = None
+_worker_warmup = 0
+_worker_batched = False
+
+
+def _init_worker(recognizer: Recognizer, loaded: bool, audio, preprocess: Preprocessor, warmup: int,
+                 batched: bool):
+    """
+    Give each pool worker its own recognizer, loading the model unless it was
+    inherited, and the audio source and preprocessing shared by all tasks, so
+    tasks only carry file names.
+    """
+    global _worker_recognizer, _worker_audio, _worker_preprocess, _worker_warmup, _worker_batched
+    _worker_recognizer = recognizer
+    _worker_audio, _worker_preprocess, _worker_warmup, _worker_batched = audio, preprocess, warmup, batched
+    if not loaded:
+        load_recognizer(_worker_recognizer)
+
+
+def _transcribe_in_worker(wav_files: List[str]):
+    return transcribe_files(_worker_recognizer, _worker_audio, wav_files, _worker_preprocess, _worker_warmup,
+                            _worker_batched)
+
+
+def run_benchmark(recognizer: Recognizer, wav_dir: str, wav_files: List[str], workers: int = 1,
+                  batch_size: int = 1, audio=None, store: ResultStore = None,
+                  preprocess: Preprocessor = None, warmup: int = 1) -> pd.DataFrame:
+    """
+    Transcribe wav_files with one recognizer, or with a pool of worker processes
+    that each own a recognizer and pull batches from a shared queue.
+    Per-file durations are measured inside the workers; completed_at is the
+    wall-clock time since the start of the run at which each file finished.
+    Audio is read from wav_dir unless a decoded AudioCache is given.
+    Finished rows are appended to store as soon as they arrive.
+    Each recognizer's first warmup files are flagged and left out of the
+    steady-state latency figures.
+    """
+    if audio is None:
+        audio = WavDirectory(wav_dir)
+    rows = []
+    num_wav_files = len(wav_files)
+    batches = make_batches(wav_dir, wav_files, batch_size)
+    if workers <= 1:
+        load_recognizer(recognizer)
+        print_load_stats(recognizer)
+        start_time = time.perf_counter()
+        results = (transcribe_files(recognizer, audio, batch, preprocess, warmup, batch_size > 1)
+                   for batch in batches)
+        pool = None
+    else:
+        # With fork the workers share the parent's model pages copy-on-write;
+        # otherwise every worker loads its own copy, which counts as wall time
+        context = multiprocessing.get_context()
+        share_model = recognizer.fork_safe and context.get_start_method() == 'fork'
+        if share_model:
+            load_recognizer(recognizer)
+            print_load_stats(recognizer)
+        start_time = time.perf_counter()
+        pool = context.Pool(workers, initializer=_init_worker,
+                            initargs=(recognizer, share_model, audio, preprocess, warmup, batch_size > 1))
+        results = pool.imap_unordered(_transcribe_in_worker, batches)
+
+    try:
+        elapsed_offset = store.elapsed_offset if store is not None else 0.0
+        for batch_rows in results:
+            completed_at = elapsed_offset + time.perf_counter() - start_time
+            for row in batch_rows:
+                row['completed_at'] = completed_at
+            rows.extend(batch_rows)
+            if store is not None:
+                store.append(batch_rows)
+            print(f'Processed {len(rows)}/{num_wav_files}')
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    columns = TRANSCRIPT_COLUMNS + (STAGE_COLUMNS if recognizer.timer.enabled else [])
+    transcripts = pd.DataFrame(rows, columns=columns)
+    print_throughput(transcripts, workers, time.perf_counter() - start_time)
+    if recognizer.timer.enabled:
+        print_stages(transcripts)
+    if recognizer.profiler is not None:
+        # Workers dumped their profiles when the pool shut down
+        recognizer.profiler.dump()
+        print(f"Profile written to {recognizer.profiler.merge()}")
+    return transcripts
+
+
+def print_load_stats(recognizer: Recognizer):
+    print(f"Model load time: {recognizer.load_time:.2f} s, "
+          f"peak RSS after load: {recognizer.rss_after_load_mb:.0f} MB")
+
+
+def print_throughput(transcripts: pd.DataFrame, workers: int, wall_time: float):
+    """Report cold and steady-state per-file latency next to aggregate wall-clock throughput."""
+    if transcripts.empty:
+        return
+    audio_time = transcripts['audio_duration'].sum()
+    print(f"{len(transcripts)} files, {audio_time:.1f} s of audio in {wall_time:.1f} s wall time "
+          f"with {workers} worker(s)")
+    cold = transcripts[transcripts['cold'].astype(bool)]
+    steady = transcripts[~transcripts['warmup'].astype(bool)]
+    if not cold.empty:
+        print(f"Cold first-file latency: {cold['duration'].mean():.3f} s")
+    if not steady.empty:
+        print(f"Mean steady-state per-file latency: {steady['duration'].mean():.3f} s "
+              f"({len(transcripts) - len(steady)} warm-up files excluded)")
+    print(f"Aggregate throughput: {audio_time / wall_time:.2f} audio s / wall s, "
+          f"{len(transcripts) / wall_time:.2f} files / s")
+
+
+def print_stages(transcripts: pd.DataFrame):
+    """Where the per-file latency went, as mean seconds and share per stage."""
+    steady = transcripts[~transcripts['warmup'].astype(bool)]
+    if steady.empty:
+        steady = transcripts
+    latency = steady['duration'].mean()
+    stages = steady[STAGE_COLUMNS].mean()
+    stages['other_time'] = max(latency - stages.sum(), 0.0)
+    parts = [f"{column[:-len('_time')]} {seconds:.3f} s ({100 * seconds / latency:.0f}%)"
+             for column, seconds in stages.items() if seconds > 0]
+    print(f"Stages per file: {', '.join(parts)}")
+
+
+def output_path(model_name: str, preprocess: Preprocessor = None) -> str:
+    """Default transcripts CSV for a model name, model directory or server URL and its preprocessing."""
+    if '://' in model_name:
+        name = 'server-' + re.sub(r'[^\w.-]+', '_', model_name.split('://', 1)[1]).strip('_')
+    else:
+        name = os.path.basename(os.path.normpath(model_name))
+    if preprocess:
+        name += '+' + re.sub(r'[^\w.=-]+', '_', preprocess.description)
+    return f'./transcripts_{name}.csv'
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Transcribe wavStore with a speech recognition backend')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), required=True, help='recognizer backend')
+    parser.add_argument('--model', required=True,
+                        help='model name or path passed to the backend (server URL for the remote backend)')
+    parser.add_argument('--option', action='append', default=[], metavar='KEY=VALUE',
+                        help='backend option, may be repeated (e.g. language=de)')
+    parser.add_argument('--wav-dir', default='./wavStore/', help='directory with the WAV corpus')
+    parser.add_argument('--output', help='transcripts CSV (default: ./transcripts_<model>.csv)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of worker processes, each with its own recognizer '
+                             '(concurrent requests for the remote backend)')
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help='files decoded together per call (Whisper decodes them as one batch)')
+    parser.add_argument('--audio-cache', metavar='DIR',
+                        help='read audio from a decoded cache, adding new or changed files to it first')
+    parser.add_argument('--resume', action='store_true',
+                        help='keep results of earlier runs with the same configuration and only transcribe '
+                             'the remaining files, e.g. after a crash or when recordings were added')
+    parser.add_argument('--warmup', type=int, default=1,
+                        help='files per recognizer left out of steady-state latency (default: 1)')
+    parser.add_argument('--manifest', action='store_true',
+                        help='take the file list from the corpus manifest (updating it first), '
+                             'skipping corrupt and unreadable files')
+    parser.add_argument('--shard', metavar='I/N',
+                        help='transcribe only shard I of N, split by audio duration; the output gets a '
+                             '.shard-I-of-N suffix, combine the shards with python -m benchmarks.sharding merge')
+    parser.add_argument('--profile-stages', action='store_true',
+                        help='record seconds per file spent reading, resampling, preprocessing, computing '
+                             'features, in inference and parsing results in the transcripts CSV')
+    parser.add_argument('--profile', nargs='?', const='', metavar='PROF',
+                        help='write a cProfile dump of the transcription calls of all workers '
+                             '(default: the transcripts CSV name with .prof)')
+    parser.add_argument('--preprocess', default='', metavar='PIPELINE',
+                        help='audio preprocessing before recognition, e.g. trim,highpass:cutoff_hz=100,normalize '
+                             '(steps: trim, normalize, highpass, denoise)')
+    return parser
+
+
+def main(argv: List[str] = None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        shard = parse_shard(args.shard) if args.shard else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    options = parse_options(args.option)
+    recognizer = create_recognizer(args.backend, args.model, **options)
+    try:
+        preprocess = Preprocessor(args.preprocess)
+    except ValueError as e:
+        parser.error(str(e))
+    fingerprint = config_fingerprint({'backend': args.backend, 'model': args.model, 'options': options,
+                                      'batch_size': args.batch_size, 'preprocessing': preprocess.description})
+    # Shards keep the fingerprint of the whole run, so merging can tell they belong together
+    path = args.output or output_path(args.model, preprocess)
+    if shard:
+        path = shard_path(path, shard)
+    recognizer.timer.enabled = args.profile_stages
+    if args.profile is not None:
+        recognizer.profiler = HotPathProfiler(args.profile or os.path.splitext(path)[0] + '.prof')
+    # Transcripts are streamed to the CSV as each file finishes
+    columns = TRANSCRIPT_COLUMNS + (STAGE_COLUMNS if args.profile_stages else [])
+    try:
+        store = ResultStore(path, columns, fingerprint, args.resume)
+    except ValueError as e:
+        print(e)
+        raise SystemExit(1)
+
+    all_files = usable_files(update_manifest(args.wav_dir)) if args.manifest else list_wav_files(args.wav_dir)
+    if shard:
+        all_files = shard_files(args.wav_dir, all_files, shard)
+        print(f"Shard {shard[0]}/{shard[1]}: {len(all_files)} files")
+    wav_files = [f for f in all_files if f not in store.done]
+    if store.done:
+        print(f"Resuming: {len(store.done)} files already transcribed, {len(wav_files)} to go")
+    if not wav_files:
+        store.close()
+        return
+    audio = update_cache(args.wav_dir, args.audio_cache, wav_files) if args.audio_cache else None
+    try:
+        run_benchmark(recognizer, args.wav_dir, wav_files, args.workers, args.batch_size, audio, store,
+                      preprocess, args.warmup)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from benchmarks.audio import read_wav
+from benchmarks.recognizers import BACKENDS, create_recognizer
+from benchmarks.runner import load_recognizer, parse_options
+
+# Long-running recognizer service that keeps models loaded, e.g.
+#   python -m benchmarks.server --backend vosk --model vosk-model-small-de-0.15 --workers 4
+#
+# POST /transcribe with raw 16 kHz mono int16 PCM (application/octet-stream)
+# or JSON {"path": "<wav file on the server>"}; the reply is JSON with the
+# transcript, the time spent waiting for a free recognizer and the time spent
+# recognizing. GET /info describes the loaded model.
+
+
+class _Waiter:
+    """A request thread blocked until a recognizer is handed to it."""
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.recognizer = None
+
+
+class RecognizerPool:
+    """
+    A fixed set of loaded recognizers; each request borrows one exclusively.
+    Released recognizers go to waiting requests in arrival order, so a newly
+    arriving request cannot take one ahead of requests already queued.
+    """
+
+    def __init__(self, backend: str, model_name: str, options: Dict[str, object], workers: int):
+        self.backend = backend
+        self.model_name = model_name
+        self.workers = workers
+        self.load_times = []
+        self._idle = []
+        self._waiters = deque()
+        self._lock = threading.Lock()
+        for _ in range(workers):
+            recognizer = create_recognizer(backend, model_name, **options)
+            load_recognizer(recognizer)
+            self.load_times.append(recognizer.load_time)
+            self._idle.append(recognizer)
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle and not self._waiters:
+                return self._idle.pop()
+            waiter = _Waiter()
+            self._waiters.append(waiter)
+        waiter.ready.wait()
+        return waiter.recognizer
+
+    def _release(self, recognizer):
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.recognizer = recognizer
+                waiter.ready.set()
+            else:
+                self._idle.append(recognizer)
+
+    def transcribe(self, pcm: np.ndarray) -> Tuple[str, float, float]:
+        """Returns (transcript, queue time, recognition time)."""
+        wait_start = time.perf_counter()
+        recognizer = self._acquire()
+        start_time = time.perf_counter()
+        try:
+            transcript = recognizer.transcribe(pcm)
+        finally:
+            self._release(recognizer)
+        return transcript, start_time - wait_start, time.perf_counter() - start_time
+
+
+class RecognizerRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so clients reuse their connection
+    # Headers and body go out as separate sends; with Nagle on, delayed ACKs add ~40 ms to each reply
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass  # one line per request would drown the benchmark output
+
+    def _reply(self, status: int, payload: Dict[str, object]):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/info':
+            self._reply(404, {'error': f'unknown path {self.path}'})
+            return
+        pool = self.server.pool
+        self._reply(200, {'backend': pool.backend, 'model': pool.model_name,
+                          'workers': pool.workers, 'load_times': pool.load_times})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path != '/transcribe':
+            self._reply(404, {'error': f'unknown path {self.path}'})
+            return
+        # Bound the number of requests in flight so overload is visible to clients
+        if not self.server.slots.acquire(blocking=False):
+            self._reply(503, {'error': 'too many pending requests'})
+            return
+        try:
+            if self.headers.get('Content-Type', '').startswith('application/json'):
+                pcm = read_wav(json.loads(body)['path'])
+            else:
+                pcm = np.frombuffer(body, dtype='<i2')
+            transcript, queue_time, duration = self.server.pool.transcribe(pcm)
+        except Exception as e:
+            self._reply(500, {'error': str(e)})
+            return
+        finally:
+            self.server.slots.release()
+        self._reply(200, {'transcript': transcript, 'queue_time': queue_time, 'duration': duration})
+
+
+def serve(pool: RecognizerPool, host: str = '127.0.0.1', port: int = 8765,
+          max_pending: int = 64) -> ThreadingHTTPServer:
+    """Create the HTTP server for a loaded pool; call serve_forever() on the result."""
+    server = ThreadingHTTPServer((host, port), RecognizerRequestHandler)
+    server.daemon_threads = True
+    server.pool = pool
+    server.slots = threading.BoundedSemaphore(max_pending)
+    return server
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='Serve a speech recognition model over local HTTP')
+    parser.add_argument('--backend', choices=sorted(b for b in BACKENDS if b != 'remote'), required=True,
+                        help='recognizer backend')
+    parser.add_argument('--model', required=True, help='model name or path passed to the backend')
+    parser.add_argument('--option', action='append', default=[], metavar='KEY=VALUE',
+                        help='backend option, may be repeated')
+    parser.add_argument('--workers', type=int, default=1, help='recognizer instances serving requests')
+    parser.add_argument('--max-pending', type=int, default=64,
+                        help='requests accepted at once before answering 503')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='port to listen on')
+    args = parser.parse_args(argv)
+
+    pool = RecognizerPool(args.backend, args.model, parse_options(args.option), args.workers)
+    server = serve(pool, args.host, args.port, args.max_pending)
+    print(f"Serving {args.backend} {args.model} with {args.workers} worker(s) on "
+          f"http://{args.host}:{args.port} (loaded in {max(pool.load_times):.2f} s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import argparse
+import glob
+import heapq
+import os
+import re
+from typing import List, Tuple
+
+import pandas as pd
+
+from benchmarks.manifest import read_manifest, usable_files
+from benchmarks.metrics import wav_duration
+from benchmarks.results import _read_complete_rows
+
+# Split a benchmark run across machines, e.g. on four hosts
+#   python -m benchmarks.runner --backend whisper --model medium --shard 1/4
+#   ...
+#   python -m benchmarks.runner --backend whisper --model medium --shard 4/4
+# and once all shard CSVs are collected in one place
+#   python -m benchmarks.sharding merge transcripts_medium.shard-*-of-4.csv
+#
+# Shards hold roughly equal amounts of audio rather than equal file counts.
+# Every host derives the same split from the file list, so they only need the
+# same corpus, not any coordination.
+
+SHARD_PATH_RE = re.compile(r'^(?P<base>.*)\.shard-(?P<index>\d+)-of-(?P<count>\d+)\.csv$')
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """'i/N' with 1 <= i <= N into (i, N)."""
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(\d+)\s*', spec or '')
+    if not match:
+        raise ValueError(f"Shard {spec!r} is not of the form i/N")
+    index, count = int(match.group(1)), int(match.group(2))
+    if not 1 <= index <= count:
+        raise ValueError(f"Shard index {index} is outside 1..{count}")
+    return index, count
+
+
+def file_durations(wav_dir: str, wav_files: List[str]) -> pd.Series:
+    """Audio length per file, from the manifest where it knows the file and from WAV headers otherwise."""
+    durations = read_manifest(wav_dir).set_index('file_name')['duration'].reindex(wav_files)
+    missing = durations[durations.isna()].index
+    for wav_file in missing:
+        try:
+            durations[wav_file] = wav_duration(os.path.join(wav_dir, wav_file))
+        except Exception:
+            durations[wav_file] = 0.0
+    return durations
+
+
+def balanced_shards(durations: pd.Series, count: int) -> List[List[str]]:
+    """
+    Longest files first, each to the shard with the least audio so far.
+    Ties are broken by file name and shard number, so the split only depends
+    on the files and their durations.
+    """
+    order = sorted(durations.items(), key=lambda item: (-item[1], item[0]))
+    heap = [(0.0, shard) for shard in range(count)]
+    shards = [[] for _ in range(count)]
+    for wav_file, duration in order:
+        total, shard = heapq.heappop(heap)
+        shards[shard].append(wav_file)
+        heapq.heappush(heap, (total + duration, shard))
+    return [sorted(files) for files in shards]
+
+
+def shard_files(wav_dir: str, wav_files: List[str], shard: Tuple[int, int]) -> List[str]:
+    """The files of shard i of N."""
+    index, count = shard
+    return balanced_shards(file_durations(wav_dir, sorted(wav_files)), count)[index - 1]
+
+
+def shard_path(path: str, shard: Tuple[int, int]) -> str:
+    """transcripts_<model>.csv -> transcripts_<model>.shard-<i>-of-<N>.csv"""
+    index, count = shard
+    return f'{os.path.splitext(path)[0]}.shard-{index}-of-{count}.csv'
+
+
+def merge_shards(paths: List[str], output: str = None, wav_dir: str = None,
+                 manifest: bool = False) -> pd.DataFrame:
+    """
+    Combine shard CSVs into one transcripts CSV after checking that they
+    belong together: same shard count, every shard present once, one run
+    configuration, no file transcribed twice and, given wav_dir, every file
+    of every shard transcribed. manifest must match the runner's --manifest.
+    """
+    shards = {}
+    for path in paths:
+        match = SHARD_PATH_RE.match(path)
+        if not match:
+            raise ValueError(f"{path} is not named like a shard output (<name>.shard-<i>-of-<N>.csv)")
+        shard = (int(match.group('index')), int(match.group('count')))
+        if shard in shards:
+            raise ValueError(f"Shard {shard[0]}/{shard[1]} given twice")
+        shards[shard] = (match.group('base'), _read_complete_rows(path))
+
+    problems = []
+    bases = {base for base, _ in shards.values()}
+    counts = {count for _, count in shards}
+    if len(bases) > 1:
+        problems.append(f"shards of different runs: {', '.join(sorted(bases))}")
+    if len(counts) > 1:
+        problems.append(f"different shard counts: {sorted(counts)}")
+    count = max(counts)
+    absent = sorted(set(range(1, count + 1)) - {index for index, _ in shards})
+    if absent:
+        problems.append(f"shards {absent} of {count} are missing")
+
+    frames = [rows.assign(_shard=index) for (index, _), (_, rows) in sorted(shards.items())]
+    merged = pd.concat(frames, ignore_index=True)
+    if 'fingerprint' in merged.columns and merged['fingerprint'].nunique() > 1:
+        problems.append(f"rows from {merged['fingerprint'].nunique()} different run configurations")
+    repeated = merged[merged.duplicated('file_name', keep=False)]
+    for file_name, group in repeated.groupby('file_name'):
+        problems.append(f"{file_name} transcribed by shards {sorted(set(group['_shard']))}")
+
+    if wav_dir is not None:
+        # Recompute the split the runner used and look for files it never finished
+        wav_files = (usable_files(read_manifest(wav_dir)) if manifest
+                     else [f for f in os.listdir(wav_dir) if f.endswith('.wav')])
+        expected = balanced_shards(file_durations(wav_dir, sorted(wav_files)), count)
+        for index, files in enumerate(expected, 1):
+            done = set(merged.loc[merged['_shard'] == index, 'file_name'])
+            missing = [f for f in files if f not in done]
+            if missing and index not in absent:
+                problems.append(f"shard {index}/{count} lacks {len(missing)} of its {len(files)} files, "
+                                f"e.g. {missing[0]}")
+
+    if problems:
+        raise ValueError("Shards are inconsistent:\n  " + "\n  ".join(problems))
+
+    merged = merged.drop(columns='_shard')
+    output = output or f'{bases.pop()}.csv'
+    merged.to_csv(output + '.tmp', index=False)
+    os.replace(output + '.tmp', output)
+    print(f"Merged {len(shards)} shards with {len(merged)} transcripts into {output}")
+    return merged
+
+
+def plan(wav_dir: str, count: int):
+    """Print how the corpus would be split into count shards."""
+    wav_files = sorted(f for f in os.listdir(wav_dir) if f.endswith('.wav'))
+    durations = file_durations(wav_dir, wav_files)
+    for index, files in enumerate(balanced_shards(durations, count), 1):
+        print(f"shard {index}/{count}: {len(files)} files, {durations[files].sum():.1f} s of audio")
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='Plan or merge sharded benchmark runs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    merge_parser = subparsers.add_parser('merge', help='combine shard CSVs into one transcripts CSV')
+    merge_parser.add_argument('shards', nargs='+', help='shard CSVs, e.g. transcripts_medium.shard-*-of-4.csv')
+    merge_parser.add_argument('--output', help='merged CSV (default: the name without the shard suffix)')
+    merge_parser.add_argument('--wav-dir', help='corpus directory, to check that every file was transcribed')
+    merge_parser.add_argument('--manifest', action='store_true',
+                              help='the shards were run with --manifest, so only usable files are expected')
+    plan_parser = subparsers.add_parser('plan', help='show the split of the corpus into shards')
+    plan_parser.add_argument('shards', type=int, help='number of shards')
+    plan_parser.add_argument('--wav-dir', default='./wavStore/', help='directory with the WAV corpus')
+    args = parser.parse_args(argv)
+
+    if args.command == 'plan':
+        plan(args.wav_dir, args.shards)
+        return
+    # Expand globs for shells that do not
+    paths = sorted({path for pattern in args.shards for path in (glob.glob(pattern) or [pattern])})
+    try:
+        merge_shards(paths, args.output, args.wav_dir, args.manifest)
+    except ValueError as e:
+        print(e)
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import argparse
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.audio import SAMPLE_RATE, WavDirectory
+from benchmarks.audio_cache import update_cache
+from benchmarks.preprocessing import Preprocessor
+from benchmarks.recognizers import BACKENDS, Recognizer, create_recognizer
+from benchmarks.runner import list_wav_files, load_recognizer, parse_options, print_load_stats
+
+# Streaming benchmark, e.g.
+#   python -m benchmarks.streaming --backend vosk --model vosk-model-small-de-0.15 --realtime
+
+STREAMING_COLUMNS = ['file_name', 'transcript', 'duration', 'audio_duration', 'first_partial',
+                     'first_partial_audio', 'endpoint_latency', 'num_partials', 'stability', 'revisions',
+                     'preprocessing']
+
+
+def is_prefix(words: List[str], other: List[str]) -> bool:
+    """Whether words is a prefix of other."""
+    return other[:len(words)] == words
+
+
+def stream_file(recognizer: Recognizer, pcm: np.ndarray, chunk_frames: int = 4000,
+                realtime: bool = False) -> Dict[str, object]:
+    """
+    Feed one utterance chunk by chunk and time the partial results.
+    With realtime each chunk is only fed once its audio would have been
+    captured by a microphone; otherwise audio is fed as fast as possible.
+
+    first_partial: wall seconds from stream start to the first non-empty partial
+    first_partial_audio: seconds of audio fed at that moment
+    endpoint_latency: wall seconds from feeding the last chunk to the final result
+    stability: share of partials that are a prefix of the final transcript
+    revisions: partials that took back words of the previous partial
+    """
+    partials = []
+    compute_time = 0.0
+    first_partial = first_partial_audio = float('nan')
+
+    recognizer.start_stream()
+    stream_start = time.perf_counter()
+    for start in range(0, len(pcm), chunk_frames):
+        chunk = pcm[start:start + chunk_frames]
+        if realtime:
+            # Wait until the end of this chunk has been "spoken"
+            delay = stream_start + (start + len(chunk)) / SAMPLE_RATE - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        feed_start = time.perf_counter()
+        text = recognizer.feed(chunk)
+        feed_end = time.perf_counter()
+        compute_time += feed_end - feed_start
+        if text and (not partials or text != partials[-1]):
+            if not partials:
+                first_partial = feed_end - stream_start
+                first_partial_audio = (start + len(chunk)) / SAMPLE_RATE
+            partials.append(text)
+
+    finish_start = time.perf_counter()
+    transcript = recognizer.finish_stream()
+    endpoint_latency = time.perf_counter() - finish_start
+    compute_time += endpoint_latency
+
+    final_words = transcript.split()
+    partial_words = [partial.split() for partial in partials]
+    stable = sum(is_prefix(words, final_words) for words in partial_words)
+    revisions = sum(not is_prefix(previous, current)
+                    for previous, current in zip(partial_words, partial_words[1:]))
+    return {
+        'transcript': transcript,
+        'duration': compute_time,
+        'audio_duration': len(pcm) / SAMPLE_RATE,
+        'first_partial': first_partial,
+        'first_partial_audio': first_partial_audio,
+        'endpoint_latency': endpoint_latency,
+        'num_partials': len(partials),
+        'stability': stable / len(partials) if partials else float('nan'),
+        'revisions': revisions,
+    }
+
+
+def run_streaming(recognizer: Recognizer, audio, wav_files: List[str], chunk_frames: int = 4000,
+                  realtime: bool = False, preprocess: Preprocessor = None) -> pd.DataFrame:
+    """
+    Stream every file through a loaded recognizer; audio is a WavDirectory or an AudioCache.
+    Preprocessing runs on the whole file before streaming and is not timed.
+    """
+    preprocess = preprocess or Preprocessor()
+    rows = []
+    num_wav_files = len(wav_files)
+    for i, wav_file in enumerate(wav_files):
+        pcm = preprocess(audio.load(wav_file))
+        row = {'file_name': wav_file, 'preprocessing': preprocess.description}
+        row.update(stream_file(recognizer, pcm, chunk_frames, realtime))
+        rows.append(row)
+        print(f'Processed {i+1}/{num_wav_files}')
+    return pd.DataFrame(rows, columns=STREAMING_COLUMNS)
+
+
+def print_summary(results: pd.DataFrame):
+    """Print percentiles of the streaming latencies and the mean partial stability."""
+    for column, title in (('first_partial', 'Time to first partial'),
+                          ('endpoint_latency', 'Endpoint latency')):
+        values = results[column].dropna()
+        if values.empty:
+            print(f"{title}: no partial results")
+            continue
+        p50, p90, p99 = np.percentile(values, [50, 90, 99])
+        print(f"{title}: p50 {p50:.3f} s, p90 {p90:.3f} s, p99 {p99:.3f} s")
+    print(f"Partial stability: {results['stability'].mean():.3f}, "
+          f"revisions per file: {results['revisions'].mean():.2f}")
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='Streaming benchmark with partial-result latencies')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), required=True, help='recognizer backend')
+    parser.add_argument('--model', required=True, help='model name or path passed to the backend')
+    parser.add_argument('--option', action='append', default=[], metavar='KEY=VALUE',
+                        help='backend option, may be repeated')
+    parser.add_argument('--wav-dir', default='./wavStore/', help='directory with the WAV corpus')
+    parser.add_argument('--chunk-frames', type=int, default=4000, help='samples fed per chunk')
+    parser.add_argument('--realtime', action='store_true',
+                        help='feed audio at real-time pace instead of as fast as possible')
+    parser.add_argument('--audio-cache', metavar='DIR',
+                        help='read audio from a decoded cache, adding new or changed files to it first')
+    parser.add_argument('--preprocess', default='', metavar='PIPELINE',
+                        help='audio preprocessing before streaming, e.g. trim,normalize')
+    parser.add_argument('--output', help='results CSV (default: ./streaming_<model>.csv)')
+    args = parser.parse_args(argv)
+
+    recognizer = create_recognizer(args.backend, args.model, **parse_options(args.option))
+    if not recognizer.supports_streaming:
+        parser.error(f"backend {args.backend} does not support streaming")
+    try:
+        preprocess = Preprocessor(args.preprocess)
+    except ValueError as e:
+        parser.error(str(e))
+    load_recognizer(recognizer)
+    print_load_stats(recognizer)
+
+    wav_files = list_wav_files(args.wav_dir)
+    if args.audio_cache:
+        audio = update_cache(args.wav_dir, args.audio_cache, wav_files)
+    else:
+        audio = WavDirectory(args.wav_dir)
+    results = run_streaming(recognizer, audio, wav_files, args.chunk_frames, args.realtime,
+                            preprocess)
+    print_summary(results)
+    model = os.path.basename(os.path.normpath(args.model))
+    results.to_csv(args.output or f'./streaming_{model}.csv', index=False)
+
+
+if __name__ == "__main__":
+    main()
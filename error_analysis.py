@@ -0,0 +1,139 @@
+import argparse
+import numpy as np
+import pandas as pd
+from typing import List
+
+from evaluate import (encode_pairs, load_annotations, model_name, normalize_texts, render_table, score_word_lists,
+                      transcripts_files)
+from normalization import Normalizer
+from wer import DELETION, INSERTION, MATCH, SUBSTITUTION, align_ops_flat
+
+ERROR_NAMES = {SUBSTITUTION: 'substitution', INSERTION: 'insertion', DELETION: 'deletion'}
+
+def load_transcripts(transcripts_paths: List[str], annotations_df: pd.DataFrame,
+                     normalizer: Normalizer = None) -> pd.DataFrame:
+    """All transcripts CSVs matched to the annotations, one row per (model, file) with normalized word lists."""
+    frames = []
+    for path in transcripts_paths:
+        transcripts_df = pd.read_csv(path, usecols=['file_name', 'transcript'])
+        transcripts_df.insert(0, 'model', model_name(path))
+        frames.append(transcripts_df)
+    merged_df = pd.merge(pd.concat(frames, ignore_index=True), annotations_df, on='file_name')
+    merged_df['hyp_words'] = normalize_texts(merged_df['transcript'], normalizer)
+    return merged_df[['model', 'file_name', 'ref_words', 'hyp_words']]
+
+def align_corpus(ref_words: pd.Series, hyp_words: pd.Series):
+    """
+    Align every row in bulk, each distinct (reference, hypothesis) pair only once.
+    Returns (pair id per row, aligned positions per distinct pair) where the
+    latter has columns pair, move, ref and hyp (words, '' on a missing side).
+    """
+    pair_ids, vocabulary, encoded = encode_pairs(ref_words, hyp_words)
+    ops = align_ops_flat(*encoded)
+    # Id -1 picks the trailing empty string
+    words = np.array(list(vocabulary.ids) + [''], dtype=object)
+    aligned = pd.DataFrame({'pair': ops['pair'], 'move': ops['move'],
+                            'ref': words[ops['ref']], 'hyp': words[ops['hyp']]})
+    return pair_ids, aligned
+
+def error_index(transcripts: pd.DataFrame) -> pd.DataFrame:
+    """
+    Count every substitution (ref -> hyp), deletion and insertion per model.
+    Returns columns model, error, ref, hyp, count sorted by model and descending count.
+    """
+    pair_ids, aligned = align_corpus(transcripts['ref_words'], transcripts['hyp_words'])
+    # How often each model produced each distinct pair, so errors are counted once per pair
+    weights = (pd.DataFrame({'model': transcripts['model'].to_numpy(), 'pair': pair_ids})
+               .groupby(['model', 'pair']).size().rename('count').reset_index())
+    errors = aligned[aligned['move'] != MATCH]
+    index = (weights.merge(errors, on='pair')
+             .groupby(['model', 'move', 'ref', 'hyp'])['count'].sum().reset_index())
+    index['error'] = index['move'].map(ERROR_NAMES)
+    index = index.sort_values(['model', 'count', 'error', 'ref', 'hyp'], ascending=[True, False, True, True, True])
+    return index[['model', 'error', 'ref', 'hyp', 'count']].reset_index(drop=True)
+
+def alignments(transcripts: pd.DataFrame) -> pd.DataFrame:
+    """Every aligned error position per model and file, in word order."""
+    pair_ids, aligned = align_corpus(transcripts['ref_words'], transcripts['hyp_words'])
+    rows = pd.DataFrame({'model': transcripts['model'].to_numpy(),
+                         'file_name': transcripts['file_name'].to_numpy(), 'pair': pair_ids})
+    aligned = aligned.assign(position=aligned.groupby('pair').cumcount())
+    aligned = aligned[aligned['move'] != MATCH]
+    merged = rows.merge(aligned, on='pair').sort_values(['model', 'file_name', 'position'], kind='stable')
+    merged['error'] = merged['move'].map(ERROR_NAMES)
+    return merged[['model', 'file_name', 'position', 'error', 'ref', 'hyp']].reset_index(drop=True)
+
+def worst_files(transcripts: pd.DataFrame, top: int) -> pd.DataFrame:
+    """The top files with the highest WER per model, with their normalized texts."""
+    scores = score_word_lists(transcripts['ref_words'], transcripts['hyp_words'])
+    worst = pd.concat([transcripts[['model', 'file_name']], scores], axis=1)
+    worst['errors'] = worst[['substitutions', 'insertions', 'deletions']].sum(axis=1)
+    worst['reference'] = transcripts['ref_words'].str.join(' ')
+    worst['hypothesis'] = transcripts['hyp_words'].str.join(' ')
+    worst = worst.sort_values(['model', 'wer', 'errors', 'file_name'], ascending=[True, False, False, True])
+    return worst.groupby('model', sort=False).head(top)
+
+def _table(df: pd.DataFrame) -> List[str]:
+    return render_table(df).splitlines()
+
+def _error_sections(index: pd.DataFrame, top: int) -> List[str]:
+    substitutions = index[index['error'] == 'substitution']
+    deleted = index[index['error'] == 'deletion'].groupby('ref')['count'].sum().nlargest(top)
+    inserted = index[index['error'] == 'insertion'].groupby('hyp')['count'].sum().nlargest(top)
+    confusions = (substitutions.groupby(['ref', 'hyp'])['count'].sum()
+                  .sort_values(ascending=False, kind='stable').head(top).reset_index())
+    lines = ['', '#### most frequent substitutions'] + _table(confusions)
+    lines += ['', '#### most deleted words'] + _table(deleted.reset_index().rename(columns={'ref': 'word'}))
+    lines += ['', '#### most inserted words'] + _table(inserted.reset_index().rename(columns={'hyp': 'word'}))
+    return lines
+
+def format_report(index: pd.DataFrame, worst: pd.DataFrame, top: int) -> str:
+    """Compact Markdown report: error totals, then top confusions and worst files across and per model."""
+    totals = index.pivot_table(index='model', columns='error', values='count', aggfunc='sum', fill_value=0)
+    totals = totals.reindex(columns=list(ERROR_NAMES.values()), fill_value=0).reset_index()
+    lines = ['# error analysis', '', '### errors per model'] + _table(totals)
+    lines += ['', '### all models'] + _error_sections(index, top)
+    for model, model_index in index.groupby('model'):
+        lines += ['', f'### {model}'] + _error_sections(model_index, top)
+        files = worst[worst['model'] == model]
+        files = pd.DataFrame({'file': files['file_name'], 'WER (%)': (files['wer'] * 100).round(1),
+                              'reference': files['reference'], 'hypothesis': files['hypothesis']})
+        lines += ['', '#### worst files'] + _table(files)
+    return '\n'.join(lines) + '\n'
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-word error analysis of transcripts CSVs against annotation.csv')
+    parser.add_argument('transcripts', nargs='*',
+                        help='transcripts CSVs to analyse (default: every transcripts_*.csv)')
+    parser.add_argument('--annotations', default='annotation.csv', help='reference annotation CSV')
+    parser.add_argument('--normalize', default='basic', metavar='RULES',
+                        help='text normalization before alignment, as in evaluate.py (default: basic)')
+    parser.add_argument('--top', type=int, default=10, help='entries per section of the report')
+    parser.add_argument('--output', default='error_report.md', help='Markdown report')
+    parser.add_argument('--index', metavar='CSV', help='also write the full confusion index (model, error, ref, hyp, count)')
+    parser.add_argument('--alignments', metavar='CSV', help='also write every aligned error per file')
+    args = parser.parse_args()
+    try:
+        normalizer = Normalizer(args.normalize)
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+
+    transcripts_paths = args.transcripts or transcripts_files()
+    if not transcripts_paths:
+        print("No transcripts_*.csv files found")
+        return
+
+    transcripts = load_transcripts(transcripts_paths, load_annotations(args.annotations, normalizer), normalizer)
+    index = error_index(transcripts)
+    report = format_report(index, worst_files(transcripts, args.top), args.top)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        f.write(report)
+    print(f"Analysed {len(transcripts)} transcripts of {transcripts['model'].nunique()} models, "
+          f"report written to {args.output}")
+    if args.index:
+        index.to_csv(args.index, index=False)
+    if args.alignments:
+        alignments(transcripts).to_csv(args.alignments, index=False)
+
+if __name__ == "__main__":
+    main()
@@ -1,122 +1,446 @@
+import argparse
+import glob
+import numpy as np
+import os
 import pandas as pd
-import re
-from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
 
-def preprocess_text(text: str) -> List[str]:
+from annotation_store import AnnotationStore
+from benchmarks.profiling import STAGE_COLUMNS
+from normalization import Normalizer, normalize_cached, token_cache_path
+from wer import Vocabulary, align_counts_flat
+
+# Shared by every call that does not pass its own normalizer, so its memo persists
+_default_normalizer = Normalizer('basic')
+
+def preprocess_text(text: str, normalizer: Normalizer = None) -> List[str]:
     """Preprocess text by converting to lowercase, removing punctuation, and splitting into words."""
     if pd.isna(text) or text == "":
         return []
-    # Convert to lowercase and remove punctuation
-    text = re.sub(r'[^\w\s]', '', str(text).lower())
-    # Split into words and filter empty strings
-    return [word for word in text.split() if word]
-
-def calculate_wer(reference: List[str], hypothesis: List[str]) -> Tuple[float, int, int, int, int]:
-    """
-    Calculate Word Error Rate using dynamic programming.
-    Returns: (WER, substitutions, insertions, deletions, total_words)
-    """
-    ref_len = len(reference)
-    hyp_len = len(hypothesis)
-    
-    # Create matrix for dynamic programming
-    dp = [[0] * (hyp_len + 1) for _ in range(ref_len + 1)]
-    
-    # Initialize first row and column
-    for i in range(ref_len + 1):
-        dp[i][0] = i
-    for j in range(hyp_len + 1):
-        dp[0][j] = j
-    
-    # Fill the matrix
-    for i in range(1, ref_len + 1):
-        for j in range(1, hyp_len + 1):
-            if reference[i-1] == hypothesis[j-1]:
-                dp[i][j] = dp[i-1][j-1]
-            else:
-                dp[i][j] = min(
-                    dp[i-1][j] + 1,      # deletion
-                    dp[i][j-1] + 1,      # insertion
-                    dp[i-1][j-1] + 1     # substitution
-                )
-    
-    # Backtrack to count error types
-    i, j = ref_len, hyp_len
-    substitutions = insertions = deletions = 0
-    
-    while i > 0 or j > 0:
-        if i > 0 and j > 0 and reference[i-1] == hypothesis[j-1]:
-            i -= 1
-            j -= 1
-        elif i > 0 and j > 0 and dp[i][j] == dp[i-1][j-1] + 1:
-            substitutions += 1
-            i -= 1
-            j -= 1
-        elif i > 0 and dp[i][j] == dp[i-1][j] + 1:
-            deletions += 1
-            i -= 1
-        else:
-            insertions += 1
-            j -= 1
-    
-    total_errors = substitutions + insertions + deletions
-    wer = total_errors / ref_len if ref_len > 0 else 0.0
-    
-    return wer, substitutions, insertions, deletions, ref_len
+    return list((normalizer or _default_normalizer)(str(text)))
+
+def normalize_texts(texts: pd.Series, normalizer: Normalizer = None) -> pd.Series:
+    """Normalize a whole column of transcripts into word lists, each distinct text only once."""
+    normalizer = normalizer or _default_normalizer
+    codes, uniques = pd.factorize(texts.fillna('').astype(str))
+    words = [normalizer(text) for text in uniques]
+    return pd.Series([words[code] for code in codes], index=texts.index, dtype=object)
+
+def score_corpus(refs: pd.Series, hyps: pd.Series, normalizer: Normalizer = None) -> pd.DataFrame:
+    """
+    Score aligned reference and hypothesis columns in bulk.
+    Identical (reference, hypothesis) pairs are aligned only once.
+    Returns one row per input row with wer, substitutions, insertions, deletions and ref_words.
+    """
+    return score_word_lists(normalize_texts(refs, normalizer), normalize_texts(hyps, normalizer))
+
+def encode_pairs(ref_words: pd.Series, hyp_words: pd.Series):
+    """
+    Intern every distinct (reference, hypothesis) pair of word lists once.
+    Returns (pair id per row, the Vocabulary, and ref_ids, ref_lens, hyp_ids,
+    hyp_lens of the distinct pairs as the flat wer.align_* functions take them).
+    """
+    ref_words = ref_words.reset_index(drop=True)
+    hyp_words = hyp_words.reset_index(drop=True)
+    # Deduplicate on the normalized text, joined with a separator that cannot occur in a word
+    pairs = pd.DataFrame({'ref': ref_words.str.join(' '), 'hyp': hyp_words.str.join(' ')})
+    pair_ids, _ = pd.factorize(pd.MultiIndex.from_frame(pairs))
+    first_rows = pd.Series(np.arange(len(pairs))).groupby(pair_ids).first().to_numpy()
+
+    vocabulary = Vocabulary()
+    ref_ids, ref_lens = vocabulary.encode_many(ref_words.iloc[first_rows].tolist())
+    hyp_ids, hyp_lens = vocabulary.encode_many(hyp_words.iloc[first_rows].tolist())
+    return pair_ids, vocabulary, (ref_ids, ref_lens, hyp_ids, hyp_lens)
+
+def score_word_lists(ref_words: pd.Series, hyp_words: pd.Series) -> pd.DataFrame:
+    """score_corpus for columns that are already normalized into word lists."""
+    pair_ids, _, encoded = encode_pairs(ref_words, hyp_words)
+    counts = align_counts_flat(*encoded)[pair_ids]
+
+    ref_len = ref_words.str.len().to_numpy()
+    errors = counts.sum(axis=1)
+    scores = pd.DataFrame({
+        'wer': np.divide(errors, ref_len, out=np.zeros(len(errors)), where=ref_len > 0),
+        'substitutions': counts[:, 0],
+        'insertions': counts[:, 1],
+        'deletions': counts[:, 2],
+        'ref_words': ref_len,
+    })
+    scores.index = ref_words.index
+    return scores
+
+def summarize(scores: pd.DataFrame) -> Dict[str, float]:
+    """Corpus totals for the output of score_corpus."""
+    total_words = int(scores['ref_words'].sum())
+    substitutions = int(scores['substitutions'].sum())
+    insertions = int(scores['insertions'].sum())
+    deletions = int(scores['deletions'].sum())
+    errors = substitutions + insertions + deletions
+    return {
+        'files': len(scores),
+        'ref_words': total_words,
+        'substitutions': substitutions,
+        'insertions': insertions,
+        'deletions': deletions,
+        'errors': errors,
+        'overall_wer': errors / total_words if total_words > 0 else 0,
+        'average_wer': float(scores['wer'].mean()) if len(scores) else 0,
+    }
+
+def model_name(transcripts_path: str) -> str:
+    """Model name encoded in a transcripts_<model>.csv file name."""
+    name = os.path.splitext(os.path.basename(transcripts_path))[0]
+    return name[len('transcripts_'):] if name.startswith('transcripts_') else name
+
+def transcripts_files(pattern: str = 'transcripts_*.csv') -> List[str]:
+    """Transcripts CSVs in the working directory, leaving out unmerged shards of distributed runs."""
+    return sorted(path for path in glob.glob(pattern) if '.shard-' not in path)
+
+def load_annotations(annotation_path: str, normalizer: Normalizer = None) -> pd.DataFrame:
+    """
+    Load annotation.csv and normalize its transcripts once for all models.
+    Normalized references are cached on disk next to the annotations, so
+    scoring again only normalizes references that were added or edited.
+    """
+    normalizer = normalizer or _default_normalizer
+    if annotation_path.endswith('.db'):
+        store = AnnotationStore(annotation_path)
+        annotations_df = store.to_dataframe()
+        store.close()
+    else:
+        annotations_df = pd.read_csv(annotation_path)
+    texts = annotations_df['transcript'].fillna('').astype(str)
+    annotations_df['ref_words'] = normalize_cached(texts, normalizer, token_cache_path(annotation_path))
+    return annotations_df[['file_name', 'ref_words']]
+
+def load_durations(manifest_path: str) -> pd.Series:
+    """Audio length in seconds per file name from a corpus manifest (python -m benchmarks.manifest)."""
+    manifest = pd.read_csv(manifest_path, usecols=['file_name', 'duration'], dtype={'file_name': str})
+    return manifest.set_index('file_name')['duration']
+
+def fill_audio_durations(transcripts_df: pd.DataFrame, durations: pd.Series) -> pd.DataFrame:
+    """Take audio_duration from the manifest where a transcripts CSV did not record it, e.g. older runs."""
+    from_manifest = transcripts_df['file_name'].map(durations)
+    if 'audio_duration' in transcripts_df.columns:
+        from_manifest = transcripts_df['audio_duration'].fillna(from_manifest)
+    return transcripts_df.assign(audio_duration=from_manifest)
+
+_annotations = None
+_normalizer = None
+_durations = None
+
+def _init_worker(annotations_df: pd.DataFrame, normalizer: Normalizer, durations: pd.Series):
+    """Hand the normalized annotations, the normalizer and the durations to a pool worker once instead of per task."""
+    global _annotations, _normalizer, _durations
+    _annotations = annotations_df
+    _normalizer = normalizer
+    _durations = durations
+
+def score_transcripts(transcripts_path: str, annotations_df: pd.DataFrame = None, normalizer: Normalizer = None,
+                      durations: pd.Series = None) -> Tuple[Dict[str, float], pd.DataFrame]:
+    """
+    Score one transcripts CSV against normalized annotations.
+    Returns its summary row and the errors and reference words of every matched file.
+    """
+    if annotations_df is None:
+        annotations_df, normalizer, durations = _annotations, _normalizer, _durations
+    transcripts_df = pd.read_csv(transcripts_path)
+    if durations is not None:
+        transcripts_df = fill_audio_durations(transcripts_df, durations)
+    merged_df = pd.merge(annotations_df, transcripts_df, on='file_name')
+    scores = score_word_lists(merged_df['ref_words'], normalize_texts(merged_df['transcript'], normalizer))
+
+    summary = {'model': model_name(transcripts_path)}
+    if 'preprocessing' in transcripts_df.columns:
+        summary['preprocessing'] = ','.join(transcripts_df['preprocessing'].dropna().unique())
+    summary.update(summarize(scores))
+    summary['transcripts'] = len(transcripts_df)
+    summary.update(speed_stats(transcripts_df))
+    file_scores = pd.DataFrame({'file_name': merged_df['file_name'],
+                                'errors': scores[['substitutions', 'insertions', 'deletions']].sum(axis=1),
+                                'ref_words': scores['ref_words']})
+    return summary, file_scores
+
+def speed_stats(transcripts_df: pd.DataFrame) -> Dict[str, float]:
+    """
+    Latency, real-time factor, throughput, cold-start and memory statistics of one benchmark run.
+    Warm-up files are left out of latency and RTF; columns that older transcripts CSVs lack are skipped.
+    """
+    stats = {}
+    if 'duration' not in transcripts_df.columns or transcripts_df['duration'].isna().all():
+        return stats
+
+    steady_df = transcripts_df
+    if 'warmup' in transcripts_df.columns:
+        steady_df = transcripts_df[~transcripts_df['warmup'].fillna(False).astype(bool)]
+    if 'cold' in transcripts_df.columns:
+        cold = transcripts_df.loc[transcripts_df['cold'].fillna(False).astype(bool), 'duration']
+        if not cold.empty:
+            stats['cold_latency'] = float(cold.mean())
+    if 'load_time' in transcripts_df.columns and transcripts_df['load_time'].notna().any():
+        stats['load_time'] = float(transcripts_df['load_time'].mean())
+    if 'rss_after_load_mb' in transcripts_df.columns and transcripts_df['rss_after_load_mb'].notna().any():
+        stats['rss_after_load_mb'] = float(transcripts_df['rss_after_load_mb'].max())
+
+    latency = steady_df['duration'].to_numpy(dtype=float)
+    if len(latency) and not np.isnan(latency).all():
+        stats['mean_latency'] = float(np.nanmean(latency))
+        p50, p90, p99 = np.nanpercentile(latency, [50, 90, 99])
+        stats.update({'p50_latency': p50, 'p90_latency': p90, 'p99_latency': p99})
+
+    if 'audio_duration' in transcripts_df.columns:
+        timed = steady_df[['duration', 'audio_duration']].dropna()
+        processing, audio = timed['duration'].sum(), timed['audio_duration'].sum()
+        if processing > 0 and audio > 0:
+            # RTF below 1 means faster than real time
+            stats['rtf'] = processing / audio
+        # Throughput covers the whole run; parallel runs overlap files, so it
+        # uses the wall clock when that was recorded
+        timed = transcripts_df[['duration', 'audio_duration']].dropna()
+        wall_time, audio = timed['duration'].sum(), timed['audio_duration'].sum()
+        if 'completed_at' in transcripts_df.columns and transcripts_df['completed_at'].notna().any():
+            wall_time = transcripts_df['completed_at'].max()
+        if wall_time > 0 and audio > 0:
+            stats['throughput'] = audio / wall_time
+    if 'peak_rss_mb' in transcripts_df.columns:
+        stats['peak_rss_mb'] = float(transcripts_df['peak_rss_mb'].max())
+    stats.update(stage_stats(steady_df))
+    return stats
+
+def stage_stats(transcripts_df: pd.DataFrame) -> Dict[str, float]:
+    """Mean seconds per file in each stage of runs with --profile-stages, the untimed rest as other_time."""
+    columns = [column for column in STAGE_COLUMNS if column in transcripts_df.columns]
+    timed = transcripts_df.dropna(subset=columns) if columns else transcripts_df.iloc[:0]
+    if timed.empty:
+        return {}
+    stats = {column: float(timed[column].mean()) for column in columns}
+    stats['other_time'] = max(float(timed['duration'].mean()) - sum(stats.values()), 0.0)
+    return stats
+
+def score_models(transcripts_paths: List[str], annotations_df: pd.DataFrame, workers: int = None,
+                 normalizer: Normalizer = None,
+                 durations: pd.Series = None) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    """
+    Score several transcripts CSVs concurrently.
+    Returns one row per model and each model's per-file scores for bootstrapping.
+    """
+    if workers is None:
+        workers = min(len(transcripts_paths), os.cpu_count() or 1)
+    if workers <= 1:
+        scored = [score_transcripts(path, annotations_df, normalizer, durations) for path in transcripts_paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(annotations_df, normalizer, durations)) as pool:
+            scored = list(pool.map(score_transcripts, transcripts_paths))
+    results = pd.DataFrame([summary for summary, _ in scored])
+    return results, {summary['model']: file_scores for summary, file_scores in scored}
+
+# Upper bound on resampled file indices held in memory at once
+BOOTSTRAP_CELLS = 1 << 22
+
+def bootstrap_samples(num_files: int, num_resamples: int, rng: np.random.Generator):
+    """Yield bootstrap resamples of file indices drawn with replacement in chunks of shape (resamples, files)."""
+    chunk = max(1, BOOTSTRAP_CELLS // max(num_files, 1))
+    for start in range(0, num_resamples, chunk):
+        size = min(chunk, num_resamples - start)
+        yield rng.integers(0, num_files, size=(size, num_files), dtype=np.int32)
+
+def bootstrap_wer(errors: np.ndarray, ref_words: np.ndarray, num_resamples: int = 1000,
+                  seed: int = 0) -> np.ndarray:
+    """Overall WER of every bootstrap resample of the files."""
+    rng = np.random.default_rng(seed)
+    samples = []
+    for indices in bootstrap_samples(len(errors), num_resamples, rng):
+        words = ref_words[indices].sum(axis=1)
+        samples.append(np.divide(errors[indices].sum(axis=1), words, out=np.zeros(len(indices)), where=words > 0))
+    return np.concatenate(samples) if samples else np.empty(0)
+
+def paired_bootstrap(errors_a: np.ndarray, errors_b: np.ndarray, ref_words: np.ndarray,
+                     num_resamples: int = 1000, seed: int = 0) -> np.ndarray:
+    """
+    Overall WER of model a minus model b on the same bootstrap resamples of
+    the files both transcribed, so per-file difficulty cancels out.
+    """
+    return bootstrap_wer(errors_a - errors_b, ref_words, num_resamples, seed)
+
+def bootstrap_intervals(file_scores: Dict[str, pd.DataFrame], num_resamples: int = 1000,
+                        confidence: float = 0.95, seed: int = 0) -> pd.DataFrame:
+    """Percentile confidence interval of every model's overall WER."""
+    tail = (1 - confidence) / 2 * 100
+    rows = []
+    for model, scores in file_scores.items():
+        samples = bootstrap_wer(scores['errors'].to_numpy(float), scores['ref_words'].to_numpy(float),
+                                num_resamples, seed)
+        low, high = np.percentile(samples, [tail, 100 - tail]) if len(scores) else (np.nan, np.nan)
+        rows.append({'model': model, 'wer_ci_low': low, 'wer_ci_high': high})
+    return pd.DataFrame(rows, columns=['model', 'wer_ci_low', 'wer_ci_high'])
+
+def compare_models(file_scores: Dict[str, pd.DataFrame], num_resamples: int = 1000,
+                   confidence: float = 0.95, seed: int = 0) -> pd.DataFrame:
+    """
+    Paired bootstrap test for every pair of models on their common files.
+    p_value is the two-sided probability of a WER difference at least this
+    far from zero arising by chance.
+    """
+    tail = (1 - confidence) / 2 * 100
+    rows = []
+    models = list(file_scores)
+    for position, model_a in enumerate(models):
+        for model_b in models[position + 1:]:
+            common = pd.merge(file_scores[model_a], file_scores[model_b], on='file_name', suffixes=('_a', '_b'))
+            if common.empty:
+                continue
+            errors_a, errors_b = common['errors_a'].to_numpy(float), common['errors_b'].to_numpy(float)
+            ref_words = common['ref_words_a'].to_numpy(float)
+            total_words = ref_words.sum()
+            difference = (errors_a.sum() - errors_b.sum()) / total_words if total_words > 0 else 0.0
+            samples = paired_bootstrap(errors_a, errors_b, ref_words, num_resamples, seed)
+            low, high = np.percentile(samples, [tail, 100 - tail])
+            p_value = min(1.0, 2 * min(np.mean(samples <= 0), np.mean(samples >= 0)))
+            rows.append({'model_a': model_a, 'model_b': model_b, 'files': len(common),
+                         'wer_difference': difference, 'ci_low': low, 'ci_high': high, 'p_value': p_value})
+    return pd.DataFrame(rows, columns=['model_a', 'model_b', 'files', 'wer_difference',
+                                       'ci_low', 'ci_high', 'p_value'])
+
+def format_results(results: pd.DataFrame, fmt: str = 'markdown') -> str:
+    """Render the per-model results as a Markdown table in the README style or as CSV."""
+    table = pd.DataFrame({
+        'model': results['model'],
+        'preprocessing': results.get('preprocessing', pd.Series('', index=results.index)).fillna(''),
+        'files': results['files'],
+        'average WER (%)': (results['average_wer'] * 100).round(1),
+        'overall WER (%)': (results['overall_wer'] * 100).round(1),
+        'S': results['substitutions'],
+        'I': results['insertions'],
+        'D': results['deletions'],
+    })
+    if not table['preprocessing'].any():
+        table = table.drop(columns='preprocessing')
+    if 'wer_ci_low' in results.columns:
+        ci = pd.DataFrame({'low': (results['wer_ci_low'] * 100).round(1), 'high': (results['wer_ci_high'] * 100).round(1)})
+        table.insert(table.columns.get_loc('overall WER (%)') + 1, '95% CI (%)',
+                     [f'{row.low}-{row.high}' for row in ci.itertuples()])
+    speed_columns = {
+        'load_time': 'load (s)',
+        'cold_latency': 'cold (s)',
+        'mean_latency': 'mean latency (s)',
+        'p50_latency': 'p50 (s)',
+        'p90_latency': 'p90 (s)',
+        'p99_latency': 'p99 (s)',
+        'rtf': 'RTF',
+        'throughput': 'audio s / wall s',
+        'rss_after_load_mb': 'RSS after load (MB)',
+        'peak_rss_mb': 'peak RSS (MB)',
+    }
+    for column, title in speed_columns.items():
+        if column in results.columns:
+            table[title] = results[column].round(3)
+    return render_table(table, fmt)
+
+def format_stages(results: pd.DataFrame, fmt: str = 'markdown') -> str:
+    """Render where each profiled model spends a file's latency, in seconds and as a share."""
+    columns = [column for column in STAGE_COLUMNS + ['other_time'] if column in results.columns]
+    profiled = results.dropna(subset=columns, how='all') if columns else results.iloc[:0]
+    if profiled.empty:
+        return ''
+    # Stages and other add up to the mean latency of the profiled files
+    latency = profiled[columns].sum(axis=1)
+    table = pd.DataFrame({'model': profiled['model'], 'profiled latency (s)': latency.round(3)})
+    for column in columns:
+        shares = profiled[column] / latency
+        table[f"{column[:-len('_time')]} (s)"] = [f'{seconds:.3f} ({share:.0%})'
+                                                 for seconds, share in zip(profiled[column], shares)]
+    return render_table(table, fmt)
+
+def format_comparisons(comparisons: pd.DataFrame, fmt: str = 'markdown') -> str:
+    """Render the paired bootstrap tests; a negative difference means model A has the lower WER."""
+    table = pd.DataFrame({
+        'model A': comparisons['model_a'],
+        'model B': comparisons['model_b'],
+        'files': comparisons['files'],
+        'WER A - B (pp)': (comparisons['wer_difference'] * 100).round(1),
+        '95% CI (pp)': [f'{low * 100:.1f} to {high * 100:.1f}'
+                        for low, high in zip(comparisons['ci_low'], comparisons['ci_high'])],
+        'p': comparisons['p_value'].round(3),
+    })
+    return render_table(table, fmt)
+
+def render_table(table: pd.DataFrame, fmt: str = 'markdown') -> str:
+    """Markdown in the README style or CSV."""
+    if fmt == 'csv':
+        return table.to_csv(index=False)
+    lines = ['|'.join(table.columns), '|'.join(['---'] * len(table.columns))]
+    lines += ['|'.join(str(value) for value in row) for row in table.itertuples(index=False)]
+    return '\n'.join(lines) + '\n'
 
 def main():
+    parser = argparse.ArgumentParser(description='Score transcripts CSVs against annotation.csv')
+    parser.add_argument('transcripts', nargs='*',
+                        help='transcripts CSVs to score (default: every transcripts_*.csv)')
+    parser.add_argument('--annotations', default='annotation.csv',
+                        help='reference annotation CSV, or the annotation tool\'s SQLite store (.db)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of scoring processes (default: one per model, up to the CPU count)')
+    parser.add_argument('--normalize', default='basic', metavar='RULES',
+                        help='text normalization before scoring: basic (lowercase, strip punctuation), german '
+                             '(also numbers as words, umlauts folded) or comma separated rules such as '
+                             'german,compounds:lexicon=compounds.txt (default: basic)')
+    parser.add_argument('--manifest', metavar='CSV',
+                        help='corpus manifest (python -m benchmarks.manifest writes wavStore.manifest.csv) '
+                             'supplying audio durations that transcripts CSVs did not record')
+    parser.add_argument('--bootstrap', type=int, default=1000, metavar='N',
+                        help='bootstrap resamples for WER confidence intervals and paired significance tests '
+                             'between models (default: 1000, 0 to skip)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the bootstrap resampling')
+    parser.add_argument('--format', choices=['markdown', 'csv'], default='markdown', help='output table format')
+    parser.add_argument('--output', help='write the table to this file instead of stdout')
+    args = parser.parse_args()
+    try:
+        normalizer = Normalizer(args.normalize)
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+
+    transcripts_paths = args.transcripts or transcripts_files()
+    if not transcripts_paths:
+        print("No transcripts_*.csv files found")
+        return
+
     # Load CSV files
     try:
-        transcripts_df = pd.read_csv('transcripts_vosk-model-small-de-0.15.csv')
-        annotations_df = pd.read_csv('annotation.csv')
+        annotations_df = load_annotations(args.annotations, normalizer)
+        durations = load_durations(args.manifest) if args.manifest else None
+        results, file_scores = score_models(transcripts_paths, annotations_df, args.workers, normalizer, durations)
     except FileNotFoundError as e:
         print(f"Error loading CSV files: {e}")
         return
-    
-    # Join dataframes on file_name
-    merged_df = pd.merge(annotations_df, transcripts_df, on='file_name', suffixes=('_ref', '_hyp'))
-    
-    print(f"Total files matched: {len(merged_df)}")
+
     print(f"Files in annotation: {len(annotations_df)}")
-    print(f"Files in transcripts: {len(transcripts_df)}")
+    if durations is not None:
+        print(f"Annotated audio: {annotations_df['file_name'].map(durations).sum() / 60:.1f} min")
+    for row in results.itertuples(index=False):
+        print(f"{row.model}: {row.files} of {row.transcripts} transcripts matched")
     print("-" * 50)
-    
-    # Calculate WER for each file
-    total_substitutions = total_insertions = total_deletions = total_words = 0
-    wer_scores = []
-    
-    for _, row in merged_df.iterrows():
-        ref_words = preprocess_text(row['transcript_ref'])
-        hyp_words = preprocess_text(row['transcript_hyp'])
-        
-        wer, subs, ins, dels, ref_len = calculate_wer(ref_words, hyp_words)
-        
-        total_substitutions += subs
-        total_insertions += ins
-        total_deletions += dels
-        total_words += ref_len
-        wer_scores.append(wer)
-        
-        #print(f"File: {row['file_name']}")
-        #print(f"  Reference: {' '.join(ref_words)}")
-        #print(f"  Hypothesis: {' '.join(hyp_words)}")
-        #print(f"  WER: {wer:.3f} (S:{subs}, I:{ins}, D:{dels}, N:{ref_len})")
-        #print()
-    
-    # Calculate overall statistics
-    overall_wer = (total_substitutions + total_insertions + total_deletions) / total_words if total_words > 0 else 0
-    average_wer = sum(wer_scores) / len(wer_scores) if wer_scores else 0
-    
-    print("=" * 50)
-    print("OVERALL RESULTS")
-    print("=" * 50)
-    print(f"Total reference words: {total_words}")
-    print(f"Total substitutions: {total_substitutions}")
-    print(f"Total insertions: {total_insertions}")
-    print(f"Total deletions: {total_deletions}")
-    print(f"Total errors: {total_substitutions + total_insertions + total_deletions}")
-    print(f"Overall WER: {overall_wer:.3f} ({overall_wer*100:.1f}%)")
-    print(f"Average WER: {average_wer:.3f} ({average_wer*100:.1f}%)")
+
+    comparisons = None
+    if args.bootstrap > 0:
+        results = results.merge(bootstrap_intervals(file_scores, args.bootstrap, seed=args.seed), on='model')
+        comparisons = compare_models(file_scores, args.bootstrap, seed=args.seed)
+
+    table = format_results(results, args.format)
+    stages = format_stages(results, args.format)
+    if stages:
+        # Stage breakdown of the runs made with --profile-stages
+        table += '\n' + stages
+    if comparisons is not None and not comparisons.empty:
+        # Paired bootstrap over the files both models transcribed
+        table += '\n' + format_comparisons(comparisons, args.format)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(table)
+        print(f"Results written to {args.output}")
+    else:
+        print(table)
 
 if __name__ == "__main__":
     main()
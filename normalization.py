@@ -0,0 +1,257 @@
+import ast
+import hashlib
+import inspect
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Text normalization applied to references and hypotheses before scoring.
+# A normalizer is written like a preprocessing pipeline: comma separated rules
+# or rule sets with optional colon separated parameters, e.g.
+#   german
+#   german,compounds:lexicon=compounds.txt
+# 'basic' is the original lowercase-and-strip-punctuation normalization.
+
+_ONES = ['null', 'eins', 'zwei', 'drei', 'vier', 'fünf', 'sechs', 'sieben', 'acht', 'neun', 'zehn',
+         'elf', 'zwölf', 'dreizehn', 'vierzehn', 'fünfzehn', 'sechzehn', 'siebzehn', 'achtzehn', 'neunzehn']
+_TENS = ['', '', 'zwanzig', 'dreißig', 'vierzig', 'fünfzig', 'sechzig', 'siebzig', 'achtzig', 'neunzig']
+_SCALES = [(10 ** 9, 'milliarde', 'milliarden'), (10 ** 6, 'million', 'millionen')]
+
+_SYMBOLS = {'%': ' prozent ', '°': ' grad ', '€': ' euro ', '&': ' und ', '+': ' plus '}
+_UMLAUTS = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss'})
+
+# Bump when a rule's output changes, so token caches written by older rules are not reused
+RULES_VERSION = 2
+
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+_SYMBOL_RE = re.compile('|'.join(re.escape(symbol) for symbol in _SYMBOLS))
+_THOUSANDS_RE = re.compile(r'\b(\d{1,3}(?:\.\d{3})+)\b(?![.,]\d)')
+# 7:30 with or without 'uhr', 7.30 only before 'uhr' so dates (24.12.2023) and versions (3.11) stay numbers
+_TIME_RE = re.compile(r'\b(?P<hours>\d{1,2})(?::(?P<minutes>\d{2})(?![.:]?\d)(?:\s*uhr\b)?'
+                      r'|\.(?P<dot_minutes>\d{2})\s*uhr\b)', re.IGNORECASE)
+_DECIMAL_RE = re.compile(r'\b(\d+),(\d+)\b')
+_NUMBER_RE = re.compile(r'\d+')
+
+
+def _below_thousand(n: int) -> str:
+    """German words for 1 <= n < 1000 as used inside larger numbers ('ein' instead of 'eins')."""
+    hundreds, rest = divmod(n, 100)
+    words = _ONES[hundreds] + 'hundert' if hundreds > 1 else 'hundert' if hundreds else ''
+    if rest == 1:
+        words += 'eins'
+    elif rest < 20 and rest:
+        words += _ONES[rest]
+    elif rest:
+        tens, ones = divmod(rest, 10)
+        words += ('ein' if ones == 1 else _ONES[ones]) + 'und' + _TENS[tens] if ones else _TENS[tens]
+    return words
+
+
+def number_to_words(n: int) -> str:
+    """Spell out a non-negative integer as spoken German, e.g. 21 -> einundzwanzig, 2500 -> zweitausendfünfhundert."""
+    if n == 0:
+        return _ONES[0]
+    words = []
+    for scale, singular, plural in _SCALES:
+        count, n = divmod(n, scale)
+        if count:
+            words.append(f'eine {singular}' if count == 1 else f'{number_to_words(count)} {plural}')
+    thousands, rest = divmod(n, 1000)
+    below_million = ''
+    if thousands:
+        prefix = '' if thousands == 1 else _below_thousand(thousands)
+        below_million = (prefix[:-1] if prefix.endswith('eins') else prefix) + 'tausend'
+    if rest:
+        below_million += _below_thousand(rest)
+    if below_million:
+        words.append(below_million)
+    return ' '.join(words)
+
+
+def lowercase(text: str) -> str:
+    return text.lower()
+
+
+def strip_punctuation(text: str) -> str:
+    """The original normalization: drop everything that is neither a word character nor whitespace."""
+    return _PUNCTUATION_RE.sub('', text)
+
+
+def expand_numbers(text: str) -> str:
+    """
+    Write digits as German number words so '50 %' matches 'fünfzig prozent'.
+    Handles thousands separators (1.000), times (7:30 / 7.30 Uhr -> sieben uhr dreißig),
+    decimal commas (2,5 -> zwei komma fünf) and the symbols % ° € & +.
+    """
+    text = _SYMBOL_RE.sub(lambda m: _SYMBOLS[m.group()], text)
+    text = _THOUSANDS_RE.sub(lambda m: m.group(1).replace('.', ''), text)
+
+    def time(m):
+        hours, minutes = int(m.group('hours')), int(m.group('minutes') or m.group('dot_minutes'))
+        if hours > 24 or minutes > 59:
+            return m.group()
+        return f' {hours} uhr {minutes} ' if minutes else f' {hours} uhr '
+
+    text = _TIME_RE.sub(time, text)
+    text = _DECIMAL_RE.sub(lambda m: f'{m.group(1)} komma {" ".join(m.group(2))}', text)
+    return _NUMBER_RE.sub(lambda m: f' {number_to_words(int(m.group()))} ', text)
+
+
+def fold_umlauts(text: str) -> str:
+    """Spell umlauts and ß as ae, oe, ue and ss so 'Lautstärke' matches 'lautstaerke'."""
+    return text.translate(_UMLAUTS)
+
+
+class CompoundJoiner:
+    """
+    Join words that were written apart into the compound listed in a lexicon,
+    e.g. 'wohnzimmer licht' -> 'wohnzimmerlicht' with 'Wohnzimmerlicht' in the lexicon.
+    The lexicon has one compound per line; matching ignores case and umlaut spelling.
+    """
+
+    def __init__(self, lexicon: str, max_parts: int = 3):
+        self.lexicon = lexicon
+        self.max_parts = max_parts
+        with open(lexicon, encoding='utf-8') as f:
+            self.compounds = {fold_umlauts(line.strip().lower()) for line in f if line.strip()}
+
+    def __call__(self, text: str) -> str:
+        words = text.split()
+        joined = []
+        i = 0
+        while i < len(words):
+            # Longest match first so three-part compounds win over their prefixes
+            for parts in range(min(self.max_parts, len(words) - i), 1, -1):
+                candidate = ''.join(words[i:i + parts])
+                if fold_umlauts(candidate) in self.compounds:
+                    joined.append(candidate)
+                    i += parts
+                    break
+            else:
+                joined.append(words[i])
+                i += 1
+        return ' '.join(joined)
+
+
+# Rules either are text -> text functions or build one from their parameters
+RULES: Dict[str, Callable[..., Callable[[str], str]]] = {
+    'lowercase': lambda: lowercase,
+    'numbers': lambda: expand_numbers,
+    'umlauts': lambda: fold_umlauts,
+    'punctuation': lambda: strip_punctuation,
+    'compounds': CompoundJoiner,
+}
+
+RULE_SETS: Dict[str, str] = {
+    'basic': 'lowercase,punctuation',
+    'german': 'lowercase,numbers,umlauts,punctuation',
+}
+
+
+def parse_rules(spec: str) -> List[Tuple[str, Dict[str, object]]]:
+    """Parse 'rule:key=value,ruleset' into (rule, parameters) pairs, expanding rule sets in place."""
+    rules = []
+    for part in filter(None, (part.strip() for part in (spec or '').split(','))):
+        name, *params = part.split(':')
+        if name in RULE_SETS:
+            rules.extend(parse_rules(RULE_SETS[name]))
+            continue
+        if name not in RULES:
+            raise ValueError(f"Unknown normalization rule {name!r}, "
+                             f"choose from {', '.join(list(RULE_SETS) + list(RULES))}")
+        kwargs = {}
+        for param in params:
+            key, sep, value = param.partition('=')
+            if not sep:
+                raise ValueError(f"Normalization parameter {param!r} is not of the form key=value")
+            try:
+                kwargs[key] = ast.literal_eval(value)
+            except (ValueError, SyntaxError):
+                kwargs[key] = value
+        try:
+            inspect.signature(RULES[name]).bind(**kwargs)
+        except TypeError as e:
+            parameters = ', '.join(inspect.signature(RULES[name]).parameters) or 'none'
+            raise ValueError(f"Normalization rule {name!r}: {e}; parameters are {parameters}") from None
+        rules.append((name, kwargs))
+    return rules
+
+
+class Normalizer:
+    """
+    A compiled set of normalization rules. Calling it turns a raw text into a
+    tuple of words; results are memoized by raw text because every reference
+    is normalized again for each model and many hypotheses repeat.
+    """
+
+    def __init__(self, spec: str = 'basic', cache_size: int = 65536):
+        self.spec = spec
+        self.cache_size = cache_size
+        self.rules = parse_rules(spec)
+        self._functions = [RULES[name](**kwargs) for name, kwargs in self.rules]
+        self._cached = lru_cache(maxsize=cache_size)(self._normalize)
+
+    def __getstate__(self):
+        # Compiled rules and the memo are rebuilt in pool workers
+        return {'spec': self.spec, 'cache_size': self.cache_size}
+
+    def __setstate__(self, state):
+        self.__init__(state['spec'], state['cache_size'])
+
+    def _normalize(self, text: str) -> Tuple[str, ...]:
+        for function in self._functions:
+            text = function(text)
+        return tuple(text.split())
+
+    def __call__(self, text: str) -> Tuple[str, ...]:
+        return self._cached(text)
+
+    @property
+    def description(self) -> str:
+        """Canonical rule list, e.g. 'lowercase,numbers,umlauts,punctuation'."""
+        return ','.join(':'.join([name] + [f'{key}={value!r}' for key, value in sorted(kwargs.items())])
+                        for name, kwargs in self.rules)
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifies the rules and the lexicons they read, for caches of normalized text."""
+        digest = hashlib.sha1(f'{RULES_VERSION}:{self.description}'.encode('utf-8'))
+        for function in self._functions:
+            if isinstance(function, CompoundJoiner):
+                digest.update('\n'.join(sorted(function.compounds)).encode('utf-8'))
+        return digest.hexdigest()[:12]
+
+
+def token_cache_path(annotation_path: str) -> str:
+    """Normalized annotations are cached next to the annotation CSV, e.g. annotation.tokens.json."""
+    return os.path.splitext(annotation_path)[0] + '.tokens.json'
+
+
+def normalize_cached(texts: Iterable[str], normalizer: Normalizer, cache_path: str) -> List[Tuple[str, ...]]:
+    """
+    Normalize texts through a JSON cache on disk keyed by normalizer fingerprint
+    and raw text. Only texts missing from the cache are normalized, and the
+    cache is rewritten atomically when any were added.
+    """
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            cache = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        cache = {}
+    entries = cache.setdefault(normalizer.fingerprint, {'rules': normalizer.description, 'texts': {}})['texts']
+
+    tokens = []
+    added = False
+    for text in texts:
+        if text not in entries:
+            entries[text] = ' '.join(normalizer(text))
+            added = True
+        tokens.append(tuple(entries[text].split()))
+    if added:
+        tmp_path = cache_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    return tokens
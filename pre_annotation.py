@@ -0,0 +1,150 @@
+import threading
+from itertools import combinations
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from evaluate import model_name, normalize_texts, score_corpus, score_word_lists, summarize, transcripts_files
+
+# Suggestions for the annotation tool: the hypotheses the benchmarks already
+# wrote to transcripts_*.csv, indexed by file name and ranked by how well each
+# model matches the annotations made so far, plus an optional recognizer that
+# fills in files no benchmark has transcribed yet.
+
+
+class HypothesisIndex:
+    """Every model's transcript per file, with models ordered from best to worst WER."""
+
+    def __init__(self, transcripts_paths: List[str] = None, annotations_df: pd.DataFrame = None):
+        if transcripts_paths is None:
+            transcripts_paths = transcripts_files()
+        frames = []
+        for path in transcripts_paths:
+            try:
+                transcripts_df = pd.read_csv(path, usecols=['file_name', 'transcript'])
+            except (OSError, ValueError) as e:
+                print(f"Error reading {path}: {e}")
+                continue
+            transcripts_df['model'] = model_name(path)
+            frames.append(transcripts_df.dropna(subset=['transcript']))
+        self.hypotheses = (pd.concat(frames, ignore_index=True) if frames
+                           else pd.DataFrame(columns=['file_name', 'transcript', 'model']))
+        self.hypotheses['transcript'] = self.hypotheses['transcript'].astype(str).str.strip()
+        self.ranking = self.rank_models(annotations_df)
+        self._by_file: Dict[str, Dict[str, str]] = {}
+        for row in self.hypotheses.itertuples(index=False):
+            self._by_file.setdefault(row.file_name, {})[row.model] = row.transcript
+
+    def rank_models(self, annotations_df: pd.DataFrame = None) -> List[str]:
+        """Models by overall WER on the files annotated so far; models without overlap come last by name."""
+        models = sorted(self.hypotheses['model'].unique())
+        if annotations_df is None or annotations_df.empty or self.hypotheses.empty:
+            return models
+        merged = pd.merge(self.hypotheses, annotations_df[['file_name', 'transcript']],
+                          on='file_name', suffixes=('', '_reference'))
+        wer = {}
+        for model, group in merged.groupby('model'):
+            wer[model] = summarize(score_corpus(group['transcript_reference'], group['transcript']))['overall_wer']
+        return sorted(models, key=lambda model: (wer.get(model, np.inf), model))
+
+    def add(self, file_name: str, model: str, transcript: str):
+        """Record a hypothesis produced while annotating; it ranks after every benchmarked model."""
+        self._by_file.setdefault(file_name, {})[model] = transcript
+        if model not in self.ranking:
+            self.ranking.append(model)
+
+    def __contains__(self, file_name: str) -> bool:
+        return file_name in self._by_file
+
+    def best(self, file_name: str) -> Optional[Tuple[str, str]]:
+        """(model, transcript) from the best ranked model that transcribed the file, or None."""
+        hypotheses = self._by_file.get(file_name, {})
+        for model in self.ranking:
+            if model in hypotheses:
+                return model, hypotheses[model]
+        return None
+
+    def disagreement(self, file_names: List[str]) -> pd.Series:
+        """
+        Mean pairwise word error rate between the models' hypotheses of each
+        file, relative to the longer of the two. NaN for files with fewer than
+        two hypotheses.
+        """
+        pairs = []
+        for file_name in file_names:
+            hypotheses = list(self._by_file.get(file_name, {}).values())
+            pairs += [(file_name, a, b) for a, b in combinations(hypotheses, 2)]
+        if not pairs:
+            return pd.Series(np.nan, index=file_names, dtype=float)
+        pairs_df = pd.DataFrame(pairs, columns=['file_name', 'a', 'b'])
+        words_a, words_b = normalize_texts(pairs_df['a']), normalize_texts(pairs_df['b'])
+        scores = score_word_lists(words_a, words_b)
+        errors = scores[['substitutions', 'insertions', 'deletions']].sum(axis=1)
+        longer = np.maximum(words_a.str.len(), words_b.str.len()).clip(lower=1)
+        rates = (errors / longer).groupby(pairs_df['file_name']).mean()
+        return rates.reindex(file_names)
+
+    def order_by_disagreement(self, file_names: List[str]) -> List[str]:
+        """Files where the models disagree most first, then files with a single or no hypothesis."""
+        rates = self.disagreement(file_names)
+        return rates.sort_values(ascending=False, kind='stable', na_position='last').index.tolist()
+
+
+class BackgroundRecognizer:
+    """
+    Transcribes files without a cached hypothesis on a worker thread. The
+    model is loaded on the thread, so the GUI stays responsive meanwhile.
+    """
+
+    def __init__(self, backend: str, model: str, wav_dir: str,
+                 on_result: Callable[[str, str, str], None], **options):
+        self.backend = backend
+        self.model = model
+        self.name = f'{backend}:{model}'
+        self.wav_dir = Path(wav_dir)
+        self.options = options
+        self.on_result = on_result  # called from the worker thread with (file name, model, transcript)
+        self._wanted: List[str] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._done = set()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def prioritize(self, file_names: List[str]):
+        """Replace the queue of files to transcribe, most urgent first."""
+        with self._lock:
+            self._wanted = [f for f in file_names if f not in self._done]
+        self._wakeup.set()
+
+    def _next(self) -> Optional[str]:
+        with self._lock:
+            while self._wanted:
+                file_name = self._wanted.pop(0)
+                if file_name not in self._done:
+                    return file_name
+            self._wakeup.clear()
+            return None
+
+    def _run(self):
+        from benchmarks.audio import read_wav
+        from benchmarks.recognizers import create_recognizer
+        recognizer = create_recognizer(self.backend, self.model, **self.options)
+        try:
+            recognizer.load()
+        except Exception as e:
+            print(f"Could not load {self.name}: {e}")
+            return
+        while True:
+            self._wakeup.wait()
+            file_name = self._next()
+            if file_name is None:
+                continue
+            self._done.add(file_name)
+            try:
+                transcript = recognizer.transcribe(read_wav(str(self.wav_dir / file_name)))
+            except Exception as e:
+                print(f"Error transcribing {file_name}: {e}")
+                continue
+            self.on_result(file_name, self.name, transcript.strip())
@@ -0,0 +1,373 @@
+import numpy as np
+from typing import Dict, List, Sequence, Tuple
+
+# Backpointer codes. When several moves reach a cell with the same cost the
+# lowest code wins, which mirrors the order of checks in the classic backtrack.
+MATCH, SUBSTITUTION, DELETION, INSERTION = 0, 1, 2, 3
+
+# Below this many DP cells NumPy call overhead outweighs vectorization and the
+# alignment runs as plain Python over rolling rows instead.
+SMALL_ALIGNMENT_CELLS = 6400
+
+
+class Vocabulary:
+    """Interns words to integer ids so alignments compare ints instead of strings."""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+
+    def encode(self, words: Sequence[str]) -> np.ndarray:
+        """Map a list of words to an int32 array of ids, adding unseen words."""
+        ids = self.ids
+        return np.fromiter((ids.setdefault(word, len(ids)) for word in words),
+                           dtype=np.int32, count=len(words))
+
+    def encode_many(self, word_lists: Sequence[Sequence[str]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Encode many word lists at once. Returns (flat ids, length of each list)."""
+        lengths = np.fromiter((len(words) for words in word_lists), dtype=np.int64, count=len(word_lists))
+        return self.encode([word for words in word_lists for word in words]), lengths
+
+
+def _distance_dtype(ref_len: int, hyp_len: int):
+    """Smallest integer dtype that holds every distance of the alignment."""
+    return np.uint16 if max(ref_len, hyp_len) < np.iinfo(np.uint16).max else np.int32
+
+
+def _fill_row(prev: np.ndarray, cur: np.ndarray, ref_id: int, hyp_ids: np.ndarray, i: int, offsets: np.ndarray):
+    """Compute DP row i into `cur` from row i-1 with whole-row NumPy operations."""
+    cur[0] = i
+    # Best of deletion (from above) and match/substitution (from the diagonal)
+    np.minimum(prev[1:] + 1, prev[:-1] + (hyp_ids != ref_id), out=cur[1:])
+    # Insertions chain left to right: cur[j] = min over k <= j of cur[k] + (j - k)
+    cur -= offsets
+    np.minimum.accumulate(cur, out=cur)
+    cur += offsets
+
+
+def _trivial_counts(ref_len: int, hyp_len: int, same: bool):
+    """Return (S, I, D) when no DP is needed, otherwise None."""
+    if same:
+        return 0, 0, 0
+    if ref_len == 0:
+        return 0, hyp_len, 0
+    if hyp_len == 0:
+        return 0, 0, ref_len
+    return None
+
+
+def _align_counts_small(reference: Sequence, hypothesis: Sequence) -> Tuple[int, int, int]:
+    """Pure-Python alignment for short sequences. Returns (S, I, D)."""
+    prev = list(range(len(hypothesis) + 1))
+    rows = [prev]
+    for i, ref_word in enumerate(reference, 1):
+        cur = [i]
+        left = i
+        for j, hyp_word in enumerate(hypothesis):
+            best = prev[j]
+            if ref_word != hyp_word:
+                up = prev[j + 1]
+                if up < best:
+                    best = up
+                if left < best:
+                    best = left
+                best += 1
+            left = best
+            cur.append(left)
+        rows.append(cur)
+        prev = cur
+
+    i, j = len(reference), len(hypothesis)
+    substitutions = insertions = deletions = 0
+    while i > 0 and j > 0:
+        cost = rows[i][j]
+        if reference[i - 1] == hypothesis[j - 1]:
+            i -= 1
+            j -= 1
+        elif cost == rows[i - 1][j - 1] + 1:
+            substitutions += 1
+            i -= 1
+            j -= 1
+        elif cost == rows[i - 1][j] + 1:
+            deletions += 1
+            i -= 1
+        else:
+            insertions += 1
+            j -= 1
+    # Whatever is left on one side is pure deletions or pure insertions
+    return substitutions, insertions + j, deletions + i
+
+
+def edit_distance(ref_ids: np.ndarray, hyp_ids: np.ndarray) -> int:
+    """Levenshtein distance between two id arrays using two rolling rows."""
+    ref_len, hyp_len = len(ref_ids), len(hyp_ids)
+    trivial = _trivial_counts(ref_len, hyp_len, np.array_equal(ref_ids, hyp_ids))
+    if trivial is not None:
+        return sum(trivial)
+
+    offsets = np.arange(hyp_len + 1, dtype=np.int32)
+    prev = offsets.copy()
+    cur = np.empty_like(prev)
+    for i in range(1, ref_len + 1):
+        _fill_row(prev, cur, ref_ids[i - 1], hyp_ids, i, offsets)
+        prev, cur = cur, prev
+    return int(prev[-1])
+
+
+def backpointers(ref_ids: np.ndarray, hyp_ids: np.ndarray) -> np.ndarray:
+    """
+    Fill the DP matrix row by row and derive one uint8 move code per cell.
+    Row 0 is all insertions and column 0 all deletions.
+    """
+    ref_len, hyp_len = len(ref_ids), len(hyp_ids)
+    offsets = np.arange(hyp_len + 1, dtype=np.int32)
+    dp = np.empty((ref_len + 1, hyp_len + 1), dtype=_distance_dtype(ref_len, hyp_len))
+    dp[0] = offsets
+    row = offsets.copy()
+    scratch = np.empty_like(row)
+    for i in range(1, ref_len + 1):
+        _fill_row(row, scratch, ref_ids[i - 1], hyp_ids, i, offsets)
+        row, scratch = scratch, row
+        dp[i] = row
+
+    # Derive every move in one pass over the matrix; assign in reverse priority
+    # so the preferred move overwrites the others
+    cells = dp[1:, 1:].astype(np.int32)
+    moves = np.full(dp.shape, INSERTION, dtype=np.uint8)
+    moves[1:, 0] = DELETION
+    inner = moves[1:, 1:]
+    inner[cells == dp[:-1, 1:] + 1] = DELETION
+    inner[cells == dp[:-1, :-1] + 1] = SUBSTITUTION
+    inner[ref_ids[:, None] == hyp_ids[None, :]] = MATCH
+    return moves
+
+
+def align_counts(ref_ids: np.ndarray, hyp_ids: np.ndarray) -> Tuple[int, int, int]:
+    """
+    Align two id arrays and count error types.
+    Returns: (substitutions, insertions, deletions)
+    """
+    ref_len, hyp_len = len(ref_ids), len(hyp_ids)
+    trivial = _trivial_counts(ref_len, hyp_len, np.array_equal(ref_ids, hyp_ids))
+    if trivial is not None:
+        return trivial
+
+    # Backtrack over a flat bytes view, which indexes much faster than an ndarray
+    width = hyp_len + 1
+    moves = backpointers(ref_ids, hyp_ids).tobytes()
+    i, j = ref_len, hyp_len
+    substitutions = insertions = deletions = 0
+    while i > 0 or j > 0:
+        move = moves[i * width + j]
+        if move == MATCH:
+            i -= 1
+            j -= 1
+        elif move == SUBSTITUTION:
+            substitutions += 1
+            i -= 1
+            j -= 1
+        elif move == DELETION:
+            deletions += 1
+            i -= 1
+        else:
+            insertions += 1
+            j -= 1
+    return substitutions, insertions, deletions
+
+
+def calculate_wer(reference: List[str], hypothesis: List[str]) -> Tuple[float, int, int, int, int]:
+    """
+    Calculate Word Error Rate, in pure Python for short utterances and on
+    interned word ids with NumPy rows for long ones.
+    Returns: (WER, substitutions, insertions, deletions, total_words)
+    """
+    ref_len = len(reference)
+    hyp_len = len(hypothesis)
+
+    trivial = _trivial_counts(ref_len, hyp_len, reference == hypothesis)
+    if trivial is not None:
+        substitutions, insertions, deletions = trivial
+    elif ref_len * hyp_len <= SMALL_ALIGNMENT_CELLS:
+        substitutions, insertions, deletions = _align_counts_small(reference, hypothesis)
+    else:
+        vocabulary = Vocabulary()
+        substitutions, insertions, deletions = align_counts(vocabulary.encode(reference),
+                                                            vocabulary.encode(hypothesis))
+
+    total_errors = substitutions + insertions + deletions
+    wer = total_errors / ref_len if ref_len > 0 else 0.0
+
+    return wer, substitutions, insertions, deletions, ref_len
+
+
+# Upper bound on padded DP cells aligned together in one batch
+BATCH_CELLS = 1 << 22
+
+
+def _pad(flat: np.ndarray, starts: np.ndarray, lengths: np.ndarray, fill: int) -> np.ndarray:
+    """Gather variable-length segments of a flat id array into a padded matrix."""
+    width = int(lengths.max())
+    columns = np.arange(width)
+    mask = columns < lengths[:, None]
+    if len(flat) == 0:
+        return np.full(mask.shape, fill, dtype=np.int32)
+    index = np.minimum(starts[:, None] + columns, len(flat) - 1)
+    return np.where(mask, flat[index], fill).astype(np.int32)
+
+
+def _chunk_moves(ref_mat: np.ndarray, hyp_mat: np.ndarray) -> np.ndarray:
+    """Fill the DP matrices of a chunk of padded pairs in lockstep and return their move codes."""
+    batch, max_ref = ref_mat.shape
+    max_hyp = hyp_mat.shape[1]
+
+    # Cells beyond a pair's own lengths only ever depend on smaller indices,
+    # so padding does not disturb the part of the matrix that is backtracked
+    offsets = np.arange(max_hyp + 1, dtype=np.int32)
+    dp = np.empty((batch, max_ref + 1, max_hyp + 1), dtype=_distance_dtype(max_ref, max_hyp))
+    dp[:, 0] = offsets
+    row = np.broadcast_to(offsets, (batch, max_hyp + 1)).copy()
+    for i in range(1, max_ref + 1):
+        cur = np.empty_like(row)
+        cur[:, 0] = i
+        np.minimum(row[:, 1:] + 1, row[:, :-1] + (hyp_mat != ref_mat[:, i - 1, None]), out=cur[:, 1:])
+        cur -= offsets
+        np.minimum.accumulate(cur, axis=1, out=cur)
+        cur += offsets
+        dp[:, i] = cur
+        row = cur
+
+    cells = dp[:, 1:, 1:].astype(np.int32)
+    moves = np.full(dp.shape, INSERTION, dtype=np.uint8)
+    moves[:, 1:, 0] = DELETION
+    inner = moves[:, 1:, 1:]
+    inner[cells == dp[:, :-1, 1:] + 1] = DELETION
+    inner[cells == dp[:, :-1, :-1] + 1] = SUBSTITUTION
+    inner[ref_mat[:, :, None] == hyp_mat[:, None, :]] = MATCH
+    return moves
+
+
+def _backtrack_chunk(moves: np.ndarray, ref_lens: np.ndarray, hyp_lens: np.ndarray):
+    """
+    Backtrack every pair of a chunk at once, one step per iteration.
+    Yields (active, move, i, j) per step, where i and j are the DP cell the
+    move leaves from and active marks pairs that have not reached the origin.
+    """
+    batch, rows, width = moves.shape
+    flat_moves = moves.reshape(-1)
+    base = np.arange(batch, dtype=np.int64) * rows * width
+    i, j = ref_lens.copy(), hyp_lens.copy()
+    active = (i > 0) | (j > 0)
+    while active.any():
+        move = flat_moves[base + i * width + j]
+        yield active, move, i, j
+        i = i - (active & (move != INSERTION))
+        j = j - (active & (move != DELETION))
+        active = (i > 0) | (j > 0)
+
+
+def _align_chunk(ref_mat: np.ndarray, ref_lens: np.ndarray, hyp_mat: np.ndarray, hyp_lens: np.ndarray) -> np.ndarray:
+    """Align a chunk of padded pairs in lockstep. Returns a (batch, 3) array of S, I, D."""
+    counts = np.zeros((len(ref_lens), 3), dtype=np.int64)
+    for active, move, _, _ in _backtrack_chunk(_chunk_moves(ref_mat, hyp_mat), ref_lens, hyp_lens):
+        counts[:, 0] += active & (move == SUBSTITUTION)
+        counts[:, 1] += active & (move == INSERTION)
+        counts[:, 2] += active & (move == DELETION)
+    return counts
+
+
+def _align_chunk_ops(ref_mat: np.ndarray, ref_lens: np.ndarray,
+                     hyp_mat: np.ndarray, hyp_lens: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Aligned word pairs of a chunk as (pair, position, move, ref id, hyp id) arrays, -1 for a missing side."""
+    steps = []
+    for active, move, i, j in _backtrack_chunk(_chunk_moves(ref_mat, hyp_mat), ref_lens, hyp_lens):
+        pairs = np.flatnonzero(active)
+        move, i, j = move[pairs], i[pairs], j[pairs]
+        ref_word = np.where(move != INSERTION, ref_mat[pairs, np.maximum(i - 1, 0)], -1)
+        hyp_word = np.where(move != DELETION, hyp_mat[pairs, np.maximum(j - 1, 0)], -1)
+        # i + j falls by one or two per step, so it orders the steps of a pair
+        steps.append((pairs, i + j, move, ref_word, hyp_word))
+    return tuple(np.concatenate(column) for column in zip(*steps))
+
+
+def _chunks(ref_lens: np.ndarray, hyp_lens: np.ndarray):
+    """Group pairs of similar length into chunks whose padded DP tensor stays within BATCH_CELLS."""
+    num_pairs = len(ref_lens)
+    order = np.lexsort((hyp_lens, ref_lens))
+    sorted_ref = ref_lens[order]
+    sorted_hyp = hyp_lens[order]
+
+    start = 0
+    while start < num_pairs:
+        # Grow the chunk while the padded DP tensor stays within budget
+        stop = start + 1
+        max_hyp = sorted_hyp[start]
+        while stop < num_pairs:
+            candidate_hyp = max(max_hyp, sorted_hyp[stop])
+            if (stop - start + 1) * (sorted_ref[stop] + 1) * (candidate_hyp + 1) > BATCH_CELLS:
+                break
+            max_hyp = candidate_hyp
+            stop += 1
+        yield order[start:stop]
+        start = stop
+
+
+def _padded_chunks(ref_ids: np.ndarray, ref_lens: np.ndarray, hyp_ids: np.ndarray, hyp_lens: np.ndarray):
+    """Yield (pair indices, ref matrix, ref lengths, hyp matrix, hyp lengths) per chunk."""
+    ref_lens = np.asarray(ref_lens, dtype=np.int64)
+    hyp_lens = np.asarray(hyp_lens, dtype=np.int64)
+    ref_starts = np.concatenate(([0], np.cumsum(ref_lens)[:-1]))
+    hyp_starts = np.concatenate(([0], np.cumsum(hyp_lens)[:-1]))
+    for chunk in _chunks(ref_lens, hyp_lens):
+        ref_mat = _pad(ref_ids, ref_starts[chunk], ref_lens[chunk], -1)
+        hyp_mat = _pad(hyp_ids, hyp_starts[chunk], hyp_lens[chunk], -2)
+        yield chunk, ref_mat, ref_lens[chunk], hyp_mat, hyp_lens[chunk]
+
+
+def align_counts_flat(ref_ids: np.ndarray, ref_lens: np.ndarray,
+                      hyp_ids: np.ndarray, hyp_lens: np.ndarray) -> np.ndarray:
+    """
+    Align many pairs given as concatenated id arrays plus per-pair lengths,
+    grouping pairs of similar length so padding stays small.
+    Returns: (num_pairs, 3) int64 array of substitutions, insertions, deletions
+    """
+    counts = np.zeros((len(ref_lens), 3), dtype=np.int64)
+    if len(ref_lens) == 0:
+        return counts
+    for chunk, ref_mat, chunk_ref_lens, hyp_mat, chunk_hyp_lens in _padded_chunks(ref_ids, ref_lens,
+                                                                                  hyp_ids, hyp_lens):
+        counts[chunk] = _align_chunk(ref_mat, chunk_ref_lens, hyp_mat, chunk_hyp_lens)
+    return counts
+
+
+def align_ops_flat(ref_ids: np.ndarray, ref_lens: np.ndarray,
+                   hyp_ids: np.ndarray, hyp_lens: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Like align_counts_flat, but keep the alignment itself: one entry per
+    aligned position, in order within each pair. Returns equal-length arrays
+    'pair', 'move' (MATCH, SUBSTITUTION, DELETION or INSERTION), 'ref' and
+    'hyp' (word ids, -1 on the side an insertion or deletion lacks).
+    """
+    columns = [[] for _ in range(5)]
+    if len(ref_lens):
+        for chunk, ref_mat, chunk_ref_lens, hyp_mat, chunk_hyp_lens in _padded_chunks(ref_ids, ref_lens,
+                                                                                      hyp_ids, hyp_lens):
+            pairs, position, move, ref_word, hyp_word = _align_chunk_ops(ref_mat, chunk_ref_lens,
+                                                                         hyp_mat, chunk_hyp_lens)
+            for column, values in zip(columns, (chunk[pairs], position, move, ref_word, hyp_word)):
+                column.append(values)
+    pair, position, move, ref_word, hyp_word = (np.concatenate(column) if column else np.empty(0, dtype=np.int64)
+                                                for column in columns)
+    order = np.lexsort((position, pair))
+    return {'pair': pair[order], 'move': move[order].astype(np.uint8),
+            'ref': ref_word[order].astype(np.int32), 'hyp': hyp_word[order].astype(np.int32)}
+
+
+def align_counts_batch(refs: Sequence[np.ndarray], hyps: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    Align many id-array pairs in bulk.
+    Returns: (len(refs), 3) int64 array of substitutions, insertions, deletions
+    """
+    ref_lens = np.fromiter((len(r) for r in refs), dtype=np.int64, count=len(refs))
+    hyp_lens = np.fromiter((len(h) for h in hyps), dtype=np.int64, count=len(hyps))
+    ref_ids = np.concatenate(refs) if len(refs) else np.empty(0, dtype=np.int32)
+    hyp_ids = np.concatenate(hyps) if len(hyps) else np.empty(0, dtype=np.int32)
+    return align_counts_flat(ref_ids, ref_lens, hyp_ids, hyp_lens)